@@ -1,11 +1,12 @@
 """Streamlit web application for automated email system."""
 import streamlit as st
 import os
-import tempfile
-import pandas as pd
-from pathlib import Path
-import time
-from config import Config
+import pyarrow as pa
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pika
+from config import CONFIG
 from cv_parser import CVParser
 from queue_manager import EmailQueueProducer
 from email_sender import EmailSender, EmailTemplates
@@ -59,29 +60,72 @@ st.markdown("""
 def initialize_session_state():
     """Initialize session state variables."""
     if 'extracted_emails' not in st.session_state:
-        st.session_state.extracted_emails = []
+        st.session_state.extracted_emails = set()
     if 'email_producer' not in st.session_state:
         st.session_state.email_producer = None
     if 'processing_complete' not in st.session_state:
         st.session_state.processing_complete = False
 
 
-def save_uploaded_file(uploaded_file) -> str:
-    """Save uploaded file to temporary directory."""
-    try:
-        # Create uploads directory if it doesn't exist
-        upload_dir = Path(Config.UPLOAD_FOLDER)
-        upload_dir.mkdir(exist_ok=True)
-        
-        # Save file
-        file_path = upload_dir / uploaded_file.name
-        with open(file_path, 'wb') as f:
-            f.write(uploaded_file.getbuffer())
-        
-        return str(file_path)
-    except Exception as e:
-        logger.error(f"Error saving file: {e}")
-        return None
+@st.cache_resource
+def get_producer():
+    """Return a RabbitMQ producer shared across Streamlit reruns; closed once at exit."""
+    producer = EmailQueueProducer()
+    atexit.register(producer.close)
+    return producer
+
+
+@st.cache_resource
+def _producer_lock() -> threading.Lock:
+    """
+    Lock serializing use of the shared producer.
+    
+    Every Streamlit session runs on its own thread and pika connections are
+    not thread-safe. Cached so that reruns, which re-execute this module, get
+    the same lock.
+    """
+    return threading.Lock()
+
+
+def queue_email_tasks(shared: dict, recipients) -> dict:
+    """Queue one email per recipient on the shared producer, dropping it if it can no longer reconnect."""
+    with _producer_lock():
+        try:
+            # Template sends can be replayed from the form, so skip broker-side persistence
+            return get_producer().send_bulk_email_tasks_shared(shared, recipients, persistent=False)
+        except pika.exceptions.AMQPConnectionError:
+            get_producer.clear()
+            raise
+
+
+@st.cache_resource(ttl=60)
+def _smtp_probe() -> bool:
+    """Test the SMTP connection, reusing the result for a minute."""
+    return EmailSender().test_connection()
+
+
+@st.cache_resource(max_entries=8)
+def _recipient_options(count: int, emails_hash: int, _emails) -> tuple:
+    """
+    Sort the extracted emails once per distinct set.
+    
+    cache_resource hands back the same immutable tuple on every rerun
+    instead of unpickling a fresh copy, so widgets get a stable object.
+    """
+    return tuple(sorted(_emails))
+
+
+def get_recipient_options() -> tuple:
+    """Return the extracted emails as a sorted tuple for widgets and tables."""
+    emails = st.session_state.extracted_emails
+    return _recipient_options(len(emails), hash(frozenset(emails)), emails)
+
+
+def append_result(results: dict, filename: str, emails: set):
+    """Append one file's extraction result to column-oriented results."""
+    results['File'].append(filename)
+    results['Emails Found'].append(len(emails))
+    results['Emails'].append(', '.join(emails) if emails else 'None')
 
 
 def main():
@@ -98,15 +142,21 @@ def main():
         
         # SMTP Configuration
         with st.expander("📮 SMTP Settings", expanded=False):
-            smtp_configured = bool(Config.SMTP_USER and Config.SMTP_PASSWORD)
+            smtp_configured = bool(CONFIG.SMTP_USER and CONFIG.SMTP_PASSWORD)
             if smtp_configured:
                 st.success("✅ SMTP Configured")
-                st.info(f"Email: {Config.SMTP_USER}")
+                st.info(f"Email: {CONFIG.SMTP_USER}")
                 
-                if st.button("Test SMTP Connection"):
+                col_test, col_clear = st.columns(2)
+                with col_test:
+                    test_clicked = st.button("Test SMTP Connection")
+                with col_clear:
+                    if st.button("Clear cache", help="Forget the last connection test result"):
+                        _smtp_probe.clear()
+                
+                if test_clicked:
                     with st.spinner("Testing connection..."):
-                        sender = EmailSender()
-                        if sender.test_connection():
+                        if _smtp_probe():
                             st.success("✅ Connection successful!")
                         else:
                             st.error("❌ Connection failed. Check credentials.")
@@ -116,8 +166,8 @@ def main():
         
         # RabbitMQ Status
         with st.expander("🐰 RabbitMQ Status", expanded=False):
-            st.info(f"Host: {Config.RABBITMQ_HOST}:{Config.RABBITMQ_PORT}")
-            st.info(f"Queue: {Config.RABBITMQ_QUEUE}")
+            st.info(f"Host: {CONFIG.RABBITMQ_HOST}:{CONFIG.RABBITMQ_PORT}")
+            st.info(f"Queue: {CONFIG.RABBITMQ_QUEUE}")
         
         st.markdown("---")
         
@@ -158,60 +208,68 @@ def main():
         if st.button("🔍 Extract Emails", type="primary", disabled=not uploaded_files):
             if uploaded_files:
                 with st.spinner("Processing files and extracting emails..."):
-                    all_emails = set()
-                    results_data = []
+                    st.session_state.extracted_emails = set()
+                    # Column lists feed straight into an Arrow table, no per-row dicts
+                    results_data = {'File': [], 'Emails Found': [], 'Emails': []}
                     
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
-                    for idx, uploaded_file in enumerate(uploaded_files):
-                        status_text.text(f"Processing: {uploaded_file.name}")
-                        
-                        # Save file
-                        file_path = save_uploaded_file(uploaded_file)
-                        
-                        if file_path:
-                            # Extract emails
-                            emails = CVParser.process_file(file_path)
-                            all_emails.update(emails)
+                    # Parse uploads in memory across all cores
+                    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                        futures = {}
+                        # Each widget update is a websocket round-trip; refresh roughly every 2%
+                        update_every = max(1, len(uploaded_files) // 50)
+                        for file_idx, uploaded_file in enumerate(uploaded_files):
+                            if uploaded_file.name.lower().endswith('.zip'):
+                                # Entries are read ahead, parsed on a thread pool and cached per entry
+                                status_text.text(f"Processing: {uploaded_file.name}")
+                                emails = CVParser.extract_from_zip(uploaded_file)
+                                st.session_state.extracted_emails.update(emails)
+                                
+                                append_result(results_data, uploaded_file.name, emails)
+                                continue
                             
-                            results_data.append({
-                                'File': uploaded_file.name,
-                                'Emails Found': len(emails),
-                                'Emails': ', '.join(emails) if emails else 'None'
-                            })
+                            if file_idx % update_every == 0:
+                                status_text.text(f"Queueing: {uploaded_file.name}")
+                            future = executor.submit(CVParser.process_upload, uploaded_file.getvalue(), uploaded_file.name)
+                            futures[future] = uploaded_file.name
+                        
+                        update_every = max(1, len(futures) // 50)
+                        for idx, future in enumerate(as_completed(futures)):
+                            filename = futures[future]
                             
-                            # Clean up
                             try:
-                                os.remove(file_path)
-                            except:
-                                pass
-                        
-                        progress_bar.progress((idx + 1) / len(uploaded_files))
+                                emails = future.result()
+                            except Exception as e:
+                                logger.error("Error processing %s: %s", filename, e)
+                                emails = set()
+                            st.session_state.extracted_emails.update(emails)
+                            
+                            append_result(results_data, filename, emails)
+                            
+                            if idx % update_every == 0 or idx == len(futures) - 1:
+                                status_text.text(f"Processed: {filename}")
+                                progress_bar.progress((idx + 1) / len(futures))
                     
                     status_text.empty()
                     progress_bar.empty()
                     
-                    # Store in session state
-                    st.session_state.extracted_emails = list(all_emails)
-                    
                     # Display results
-                    st.success(f"✅ Extraction complete! Found {len(all_emails)} unique email(s)")
+                    st.success(f"✅ Extraction complete! Found {len(st.session_state.extracted_emails)} unique email(s)")
                     
-                    if results_data:
+                    if results_data['File']:
                         st.subheader("📊 Extraction Results")
-                        df = pd.DataFrame(results_data)
-                        st.dataframe(df, use_container_width=True)
+                        # Streamlit renders Arrow tables directly, no pandas round-trip needed
+                        st.dataframe(pa.table(results_data), use_container_width=True)
                     
                     if st.session_state.extracted_emails:
                         st.subheader("📧 Extracted Email Addresses")
-                        email_df = pd.DataFrame({
-                            'Email': st.session_state.extracted_emails
-                        })
-                        st.dataframe(email_df, use_container_width=True)
+                        recipient_options = get_recipient_options()
+                        st.dataframe(pa.table({'Email': list(recipient_options)}), use_container_width=True)
                         
-                        # Download option
-                        csv = email_df.to_csv(index=False)
+                        # Download option; a single column needs no CSV writer
+                        csv = ("Email\n" + "\n".join(recipient_options)).encode()
                         st.download_button(
                             label="📥 Download Email List (CSV)",
                             data=csv,
@@ -254,10 +312,11 @@ def main():
                 
                 # Email selection
                 st.subheader("📧 Select Recipients")
+                recipient_options = get_recipient_options()
                 selected_emails = st.multiselect(
                     "Choose email addresses",
-                    st.session_state.extracted_emails,
-                    default=st.session_state.extracted_emails
+                    recipient_options,
+                    default=recipient_options
                 )
                 
                 submit_screening = st.form_submit_button("📤 Send Screening Emails", type="primary")
@@ -270,42 +329,39 @@ def main():
                     else:
                         with st.spinner("Queueing emails..."):
                             try:
-                                # Initialize producer
-                                producer = EmailQueueProducer()
+                                # Render once; the template is identical for every recipient
+                                template = EmailTemplates.screening_email(
+                                    candidate_name=candidate_name or "Candidate",
+                                    position=position,
+                                    company_name=company_name,
+                                    hr_name=hr_name,
+                                    questions=questions,
+                                    additional_info=additional_info
+                                )
                                 
-                                # Prepare emails
-                                email_tasks = []
-                                for email in selected_emails:
-                                    template = EmailTemplates.screening_email(
-                                        candidate_name=candidate_name or "Candidate",
-                                        position=position,
-                                        company_name=company_name,
-                                        hr_name=hr_name,
-                                        questions=questions,
-                                        additional_info=additional_info
-                                    )
-                                    
-                                    email_tasks.append({
-                                        'to': email,
-                                        'subject': template['subject'],
-                                        'body': template['body'],
-                                        'from_name': from_name,
-                                        'template_type': 'screening'
-                                    })
+                                # Fields shared by every recipient; the producer only adds 'to'
+                                shared = {
+                                    'subject': template['subject'],
+                                    'body': template['body'],
+                                    'from_name': from_name,
+                                    'template_type': 'screening',
+                                    'content_type': template.get('content_type')
+                                }
                                 
                                 # Send to queue
-                                stats = producer.send_bulk_email_tasks(email_tasks)
-                                producer.close()
+                                stats = queue_email_tasks(shared, selected_emails)
                                 
                                 st.success(f"✅ {stats['success']} email(s) queued successfully!")
                                 if stats['failed'] > 0:
                                     st.warning(f"⚠️ {stats['failed']} email(s) failed to queue")
+                                if stats.get('aborted'):
+                                    st.error("❌ Queueing stopped early because most emails were failing; the rest were not queued")
                                 
                                 st.info("📬 Emails are being processed in the background by the email worker.")
                                 
                             except Exception as e:
                                 st.error(f"❌ Error: {str(e)}")
-                                logger.error(f"Error sending screening emails: {e}")
+                                logger.error("Error sending screening emails: %s", e)
     
     # Tab 3: Rejection Email
     with tab3:
@@ -335,7 +391,7 @@ def main():
                 st.subheader("📧 Select Recipients")
                 selected_emails_rej = st.multiselect(
                     "Choose email addresses",
-                    st.session_state.extracted_emails,
+                    get_recipient_options(),
                     key="rej_emails"
                 )
                 
@@ -349,38 +405,36 @@ def main():
                     else:
                         with st.spinner("Queueing emails..."):
                             try:
-                                producer = EmailQueueProducer()
+                                # Render once; the template is identical for every recipient
+                                template = EmailTemplates.rejection_email(
+                                    candidate_name=candidate_name_rej or "Candidate",
+                                    position=position_rej,
+                                    company_name=company_name_rej,
+                                    hr_name=hr_name_rej,
+                                    additional_message=additional_message
+                                )
                                 
-                                email_tasks = []
-                                for email in selected_emails_rej:
-                                    template = EmailTemplates.rejection_email(
-                                        candidate_name=candidate_name_rej or "Candidate",
-                                        position=position_rej,
-                                        company_name=company_name_rej,
-                                        hr_name=hr_name_rej,
-                                        additional_message=additional_message
-                                    )
-                                    
-                                    email_tasks.append({
-                                        'to': email,
-                                        'subject': template['subject'],
-                                        'body': template['body'],
-                                        'from_name': from_name_rej,
-                                        'template_type': 'rejection'
-                                    })
+                                shared = {
+                                    'subject': template['subject'],
+                                    'body': template['body'],
+                                    'from_name': from_name_rej,
+                                    'template_type': 'rejection',
+                                    'content_type': template.get('content_type')
+                                }
                                 
-                                stats = producer.send_bulk_email_tasks(email_tasks)
-                                producer.close()
+                                stats = queue_email_tasks(shared, selected_emails_rej)
                                 
                                 st.success(f"✅ {stats['success']} email(s) queued successfully!")
                                 if stats['failed'] > 0:
                                     st.warning(f"⚠️ {stats['failed']} email(s) failed to queue")
+                                if stats.get('aborted'):
+                                    st.error("❌ Queueing stopped early because most emails were failing; the rest were not queued")
                                 
                                 st.info("📬 Emails are being processed in the background.")
                                 
                             except Exception as e:
                                 st.error(f"❌ Error: {str(e)}")
-                                logger.error(f"Error sending rejection emails: {e}")
+                                logger.error("Error sending rejection emails: %s", e)
     
     # Tab 4: Custom Email
     with tab4:
@@ -419,7 +473,7 @@ Best regards,
                 st.subheader("📧 Select Recipients")
                 selected_emails_custom = st.multiselect(
                     "Choose email addresses",
-                    st.session_state.extracted_emails,
+                    get_recipient_options(),
                     key="custom_emails"
                 )
                 
@@ -433,8 +487,6 @@ Best regards,
                     else:
                         with st.spinner("Queueing emails..."):
                             try:
-                                producer = EmailQueueProducer()
-                                
                                 variables = {
                                     'candidate_name': var_candidate,
                                     'position': var_position,
@@ -442,34 +494,34 @@ Best regards,
                                     'hr_name': var_hr
                                 }
                                 
-                                email_tasks = []
-                                for email in selected_emails_custom:
-                                    template = EmailTemplates.custom_email(
-                                        subject=subject_custom,
-                                        body=body_custom,
-                                        variables=variables
-                                    )
-                                    
-                                    email_tasks.append({
-                                        'to': email,
-                                        'subject': template['subject'],
-                                        'body': template['body'],
-                                        'from_name': from_name_custom,
-                                        'template_type': 'custom'
-                                    })
+                                # Render once; the template is identical for every recipient
+                                template = EmailTemplates.custom_email(
+                                    subject=subject_custom,
+                                    body=body_custom,
+                                    variables=variables
+                                )
+                                
+                                shared = {
+                                    'subject': template['subject'],
+                                    'body': template['body'],
+                                    'from_name': from_name_custom,
+                                    'template_type': 'custom',
+                                    'content_type': template.get('content_type')
+                                }
                                 
-                                stats = producer.send_bulk_email_tasks(email_tasks)
-                                producer.close()
+                                stats = queue_email_tasks(shared, selected_emails_custom)
                                 
                                 st.success(f"✅ {stats['success']} email(s) queued successfully!")
                                 if stats['failed'] > 0:
                                     st.warning(f"⚠️ {stats['failed']} email(s) failed to queue")
+                                if stats.get('aborted'):
+                                    st.error("❌ Queueing stopped early because most emails were failing; the rest were not queued")
                                 
                                 st.info("📬 Emails are being processed in the background.")
                                 
                             except Exception as e:
                                 st.error(f"❌ Error: {str(e)}")
-                                logger.error(f"Error sending custom emails: {e}")
+                                logger.error("Error sending custom emails: %s", e)
     
     # Footer
     st.markdown("---")
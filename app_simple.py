@@ -1,18 +1,60 @@
 """Simplified Streamlit web application - no RabbitMQ required."""
 import streamlit as st
 import os
+import re
 import tempfile
-import pandas as pd
+import io
+import shutil
 from pathlib import Path
-import time
-from config import Config
-from cv_parser import CVParser
-from email_sender import EmailSender, EmailTemplates
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from config import CONFIG
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Manual entry parsing, compiled once instead of on every click
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+_SPLIT_RE = re.compile(r'[,\n]+')
+
+# Optional Hyperscan database for validating large pastes in a single scan
+try:
+    import hyperscan
+    
+    _EMAIL_HS_DB = hyperscan.Database()
+    _EMAIL_HS_DB.compile(
+        expressions=[b'^' + _EMAIL_RE.pattern.encode()],
+        ids=[0],
+        elements=1,
+        flags=[hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SOM_LEFTMOST]
+    )
+except ImportError:
+    _EMAIL_HS_DB = None
+
+
+def match_emails(entries: list) -> list:
+    """Return whether each entry starts with a valid email, like _EMAIL_RE.match."""
+    if _EMAIL_HS_DB is None:
+        return [bool(_EMAIL_RE.match(entry)) for entry in entries]
+    
+    # Scan all entries at once, one per line; a match starting at a line start validates that line
+    encoded = [entry.encode() for entry in entries]
+    matched_starts = set()
+    
+    def on_match(_id, start, _end, _flags, _context):
+        matched_starts.add(start)
+    
+    _EMAIL_HS_DB.scan(b'\n'.join(encoded), match_event_handler=on_match)
+    
+    flags = []
+    offset = 0
+    for entry in encoded:
+        flags.append(offset in matched_starts)
+        offset += len(entry) + 1
+    return flags
+
 # Page configuration
 st.set_page_config(
     page_title="Lizmail - Automated Email System",
@@ -51,49 +93,106 @@ st.markdown("""
 def initialize_session_state():
     """Initialize session state variables."""
     if 'extracted_emails' not in st.session_state:
-        st.session_state.extracted_emails = []
+        st.session_state.extracted_emails = set()
+
+
+@st.cache_resource
+def get_sender():
+    """Return one EmailSender shared across reruns and sessions."""
+    from email_sender import EmailSender
+    return EmailSender()
 
 
-def save_uploaded_file(uploaded_file) -> str:
-    """Save uploaded file to temporary directory."""
+@st.cache_resource(max_entries=8)
+def _sorted_emails(count: int, emails_hash: int, _emails) -> tuple:
+    """Sort the emails once per distinct set and share the same tuple across reruns."""
+    return tuple(sorted(_emails))
+
+
+def sorted_emails() -> tuple:
+    """Return the extracted emails as a sorted tuple for widgets and tables."""
+    emails = st.session_state.extracted_emails
+    return _sorted_emails(len(emails), hash(frozenset(emails)), emails)
+
+
+@st.cache_data
+def emails_csv(emails: tuple) -> bytes:
+    """Render the email list as CSV with Arrow's C++ writer, cached per list."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    
+    buffer = io.BytesIO()
+    pa_csv.write_csv(pa.table({'Email': list(emails)}), buffer)
+    return buffer.getvalue()
+
+
+def save_uploaded_file(uploaded_file, upload_dir=None) -> str:
+    """Save uploaded file to a directory (CONFIG.UPLOAD_FOLDER by default)."""
     try:
-        upload_dir = Path(Config.UPLOAD_FOLDER)
+        upload_dir = Path(upload_dir or CONFIG.UPLOAD_FOLDER)
         upload_dir.mkdir(exist_ok=True)
         
-        file_path = upload_dir / uploaded_file.name
-        with open(file_path, 'wb') as f:
-            f.write(uploaded_file.getbuffer())
+        # Unique name so two uploads called e.g. cv.pdf don't overwrite each other;
+        # keep the suffix since CVParser dispatches on it
+        with tempfile.NamedTemporaryFile(
+            delete=False, dir=upload_dir, suffix=Path(uploaded_file.name).suffix
+        ) as f:
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
         
-        return str(file_path)
+        return f.name
     except Exception as e:
         logger.error(f"Error saving file: {e}")
         return None
 
 
 def send_emails_sync(email_list, progress_bar, status_text):
-    """Send emails synchronously with progress updates."""
-    sender = EmailSender()
+    """Send emails over CONFIG.CONCURRENCY parallel SMTP sessions with progress updates."""
+    from email_sender import RateLimiter
+    
+    sender = get_sender()
+    limiter = RateLimiter(CONFIG.MSGS_PER_MIN)
     total = len(email_list)
-    sent = 0
-    failed = 0
     
-    for idx, email_data in enumerate(email_list, 1):
-        try:
-            status_text.text(f"Sending email {idx}/{total} to {email_data.get('to', 'unknown')}")
-            success = sender.send_email(email_data)
-            
-            if success:
-                sent += 1
-            else:
-                failed += 1
-            
-            progress_bar.progress(idx / total)
-            time.sleep(Config.PROCESSING_DELAY)
-            
-        except Exception as e:
-            logger.error(f"Error sending email: {e}")
-            failed += 1
+    pending = queue.Queue()
+    for email_data in email_list:
+        pending.put(email_data)
+    
+    def drain():
+        while True:
+            try:
+                yield pending.get_nowait()
+            except queue.Empty:
+                return
+    
+    completed = 0
+    lock = threading.Lock()
     
+    def on_progress(_idx):
+        nonlocal completed
+        with lock:
+            completed += 1
+    
+    # Each worker keeps its own SMTP session and pulls from the shared queue.
+    # Streamlit widgets must be updated from this thread, so poll for progress here.
+    workers = max(1, min(CONFIG.CONCURRENCY, total))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(sender.send_bulk, drain(), on_progress, limiter)
+            for _ in range(workers)
+        ]
+        not_done = futures
+        shown = -1
+        while not_done:
+            _, not_done = wait(not_done, timeout=0.25)
+            # Skip the websocket round-trip when nothing has changed
+            if completed != shown:
+                shown = completed
+                status_text.text(f"Sent {shown}/{total}")
+                progress_bar.progress(shown / total)
+    
+    sent = sum(future.result()[0] for future in futures)
+    failed = sum(future.result()[1] for future in futures)
     return sent, failed
 
 
@@ -111,14 +210,14 @@ def main():
         
         # SMTP Configuration
         with st.expander("📮 SMTP Settings", expanded=False):
-            smtp_configured = bool(Config.SMTP_USER and Config.SMTP_PASSWORD)
+            smtp_configured = bool(CONFIG.SMTP_USER and CONFIG.SMTP_PASSWORD)
             if smtp_configured:
                 st.success("✅ SMTP Configured")
-                st.info(f"Email: {Config.SMTP_USER}")
+                st.info(f"Email: {CONFIG.SMTP_USER}")
                 
                 if st.button("Test SMTP Connection"):
                     with st.spinner("Testing connection..."):
-                        sender = EmailSender()
+                        sender = get_sender()
                         if sender.test_connection():
                             st.success("✅ Connection successful!")
                         else:
@@ -165,6 +264,10 @@ def main():
         
         if st.button("🔍 Extract Emails", type="primary", disabled=not uploaded_files):
             if uploaded_files:
+                # Parser libraries and pandas are heavy; only load them when extracting
+                import pandas as pd
+                from cv_parser import CVParser
+                
                 with st.spinner("Processing files and extracting emails..."):
                     all_emails = set()
                     results_data = []
@@ -172,48 +275,86 @@ def main():
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
-                    for idx, uploaded_file in enumerate(uploaded_files):
-                        status_text.text(f"Processing: {uploaded_file.name}")
-                        
-                        file_path = save_uploaded_file(uploaded_file)
-                        
-                        if file_path:
-                            emails = CVParser.process_file(file_path)
-                            all_emails.update(emails)
-                            
-                            results_data.append({
-                                'File': uploaded_file.name,
-                                'Emails Found': len(emails),
-                                'Emails': ', '.join(emails) if emails else 'None'
-                            })
+                    # Uploads only live for this extraction; the directory is removed in one go
+                    with tempfile.TemporaryDirectory() as tmpdir:
+                        # Save everything first, then parse the files in parallel
+                        saved_files = []
+                        # Each widget update is a websocket round-trip; refresh about every 1%
+                        update_every = max(1, len(uploaded_files) // 100)
+                        for file_idx, uploaded_file in enumerate(uploaded_files):
+                            if uploaded_file.name.lower().endswith('.zip'):
+                                # Parse ZIP entries straight from the upload, no disk round-trip;
+                                # entries are read ahead, parsed on a thread pool and cached per entry
+                                status_text.text(f"Processing: {uploaded_file.name}")
+                                emails = CVParser.extract_from_zip(uploaded_file)
+                                all_emails.update(emails)
+                                
+                                results_data.append({
+                                    'File': uploaded_file.name,
+                                    'Emails Found': len(emails),
+                                    'Emails': ', '.join(emails) if emails else 'None'
+                                })
+                                continue
                             
-                            try:
-                                os.remove(file_path)
-                            except:
-                                pass
+                            if file_idx % update_every == 0:
+                                status_text.text(f"Saving: {uploaded_file.name}")
+                            file_path = save_uploaded_file(uploaded_file, tmpdir)
+                            if file_path:
+                                saved_files.append((file_path, uploaded_file.name))
                         
-                        progress_bar.progress((idx + 1) / len(uploaded_files))
+                        max_workers = max(1, min(os.cpu_count() or 1, len(saved_files)))
+                        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                            futures = {
+                                executor.submit(CVParser.process_file, file_path): name
+                                for file_path, name in saved_files
+                            }
+                            
+                            update_every = max(1, len(futures) // 100)
+                            for idx, future in enumerate(as_completed(futures)):
+                                name = futures[future]
+                                
+                                try:
+                                    emails = future.result()
+                                except Exception as e:
+                                    logger.error(f"Error processing {name}: {e}")
+                                    emails = set()
+                                all_emails.update(emails)
+                                
+                                results_data.append({
+                                    'File': name,
+                                    'Emails Found': len(emails),
+                                    'Emails': ', '.join(emails) if emails else 'None'
+                                })
+                                
+                                if idx % update_every == 0 or idx == len(futures) - 1:
+                                    status_text.text(f"Processed: {name}")
+                                    progress_bar.progress((idx + 1) / len(futures))
                     
                     status_text.empty()
                     progress_bar.empty()
                     
-                    st.session_state.extracted_emails = list(all_emails)
+                    st.session_state.extracted_emails = all_emails
                     
                     st.success(f"✅ Extraction complete! Found {len(all_emails)} unique email(s)")
                     
                     if results_data:
                         st.subheader("📊 Extraction Results")
-                        df = pd.DataFrame(results_data)
+                        # Arrow-backed narrow dtypes shrink the payload sent to the browser
+                        df = pd.DataFrame(results_data).astype({
+                            'File': 'string[pyarrow]',
+                            'Emails Found': 'int32',
+                            'Emails': 'string[pyarrow]'
+                        })
                         st.dataframe(df, use_container_width=True)
                     
                     if st.session_state.extracted_emails:
                         st.subheader("📧 Extracted Email Addresses")
                         email_df = pd.DataFrame({
-                            'Email': st.session_state.extracted_emails
+                            'Email': pd.array(list(sorted_emails()), dtype='string[pyarrow]')
                         })
                         st.dataframe(email_df, use_container_width=True)
                         
-                        csv = email_df.to_csv(index=False)
+                        csv = emails_csv(sorted_emails())
                         st.download_button(
                             label="📥 Download Email List (CSV)",
                             data=csv,
@@ -241,29 +382,22 @@ def main():
             st.write("")  # Spacing
             if st.button("➕ Add Emails", type="secondary"):
                 if manual_email_input:
-                    # Parse emails from input
-                    import re
-                    # Split by newlines and commas
-                    raw_emails = re.split(r'[,\n]+', manual_email_input)
+                    # Split by newlines and commas, then clean and validate all entries in one call
+                    entries = [entry.strip() for entry in _SPLIT_RE.split(manual_email_input)]
+                    entries = [entry for entry in entries if entry]
                     
-                    # Clean and validate emails
                     valid_emails = []
                     invalid_emails = []
-                    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-                    
-                    for email in raw_emails:
-                        email = email.strip()
-                        if email:
-                            if re.match(email_pattern, email):
-                                valid_emails.append(email.lower())
-                            else:
-                                invalid_emails.append(email)
+                    for entry, is_valid in zip(entries, match_emails(entries)):
+                        if is_valid:
+                            valid_emails.append(entry.lower())
+                        else:
+                            invalid_emails.append(entry)
                     
                     # Add to session state (avoid duplicates)
                     if valid_emails:
                         initial_count = len(st.session_state.extracted_emails)
-                        st.session_state.extracted_emails.extend(valid_emails)
-                        st.session_state.extracted_emails = list(set(st.session_state.extracted_emails))
+                        st.session_state.extracted_emails.update(valid_emails)
                         added_count = len(st.session_state.extracted_emails) - initial_count
                         
                         st.success(f"✅ Added {added_count} new email(s)! Total: {len(st.session_state.extracted_emails)}")
@@ -276,8 +410,9 @@ def main():
         # Show current email list if exists
         if st.session_state.extracted_emails:
             with st.expander("📋 View All Email Addresses", expanded=False):
+                import pandas as pd
                 email_list_df = pd.DataFrame({
-                    'Email': st.session_state.extracted_emails
+                    'Email': pd.array(list(sorted_emails()), dtype='string[pyarrow]')
                 })
                 st.dataframe(email_list_df, use_container_width=True)
                 
@@ -285,14 +420,13 @@ def main():
                 st.write("**Remove Emails:**")
                 emails_to_remove = st.multiselect(
                     "Select email(s) to remove",
-                    st.session_state.extracted_emails,
+                    sorted_emails(),
                     key="remove_emails"
                 )
                 
                 if st.button("🗑️ Remove Selected", key="remove_btn"):
                     if emails_to_remove:
-                        for email in emails_to_remove:
-                            st.session_state.extracted_emails.remove(email)
+                        st.session_state.extracted_emails -= set(emails_to_remove)
                         st.success(f"✅ Removed {len(emails_to_remove)} email(s)")
                         st.rerun()
     
@@ -330,10 +464,11 @@ def main():
                                               placeholder="Any additional details...")
                 
                 st.subheader("📧 Select Recipients")
+                recipient_options = sorted_emails()
                 selected_emails = st.multiselect(
                     "Choose email addresses",
-                    st.session_state.extracted_emails,
-                    default=st.session_state.extracted_emails
+                    recipient_options,
+                    default=recipient_options
                 )
                 
                 submit_screening = st.form_submit_button("📤 Send Screening Emails", type="primary")
@@ -344,23 +479,28 @@ def main():
                     elif not selected_emails:
                         st.error("❌ Please select at least one recipient")
                     else:
-                        email_tasks = []
-                        for email in selected_emails:
-                            template = EmailTemplates.screening_email(
-                                candidate_name=candidate_name or "Candidate",
-                                position=position,
-                                company_name=company_name,
-                                hr_name=hr_name,
-                                questions=questions,
-                                additional_info=additional_info
-                            )
-                            
-                            email_tasks.append({
+                        from email_sender import EmailTemplates
+                        
+                        # Same content for every recipient, so render it once
+                        template = EmailTemplates.screening_email(
+                            candidate_name=candidate_name or "Candidate",
+                            position=position,
+                            company_name=company_name,
+                            hr_name=hr_name,
+                            questions=questions,
+                            additional_info=additional_info
+                        )
+                        
+                        email_tasks = [
+                            {
                                 'to': email,
                                 'subject': template['subject'],
                                 'body': template['body'],
-                                'from_name': from_name
-                            })
+                                'from_name': from_name,
+                                'content_type': template.get('content_type')
+                            }
+                            for email in selected_emails
+                        ]
                         
                         # Send emails with progress tracking
                         with st.spinner("Sending emails..."):
@@ -406,7 +546,7 @@ def main():
                 st.subheader("📧 Select Recipients")
                 selected_emails_rej = st.multiselect(
                     "Choose email addresses",
-                    st.session_state.extracted_emails,
+                    sorted_emails(),
                     key="rej_emails"
                 )
                 
@@ -418,22 +558,27 @@ def main():
                     elif not selected_emails_rej:
                         st.error("❌ Please select at least one recipient")
                     else:
-                        email_tasks = []
-                        for email in selected_emails_rej:
-                            template = EmailTemplates.rejection_email(
-                                candidate_name=candidate_name_rej or "Candidate",
-                                position=position_rej,
-                                company_name=company_name_rej,
-                                hr_name=hr_name_rej,
-                                additional_message=additional_message
-                            )
-                            
-                            email_tasks.append({
+                        from email_sender import EmailTemplates
+                        
+                        # Same content for every recipient, so render it once
+                        template = EmailTemplates.rejection_email(
+                            candidate_name=candidate_name_rej or "Candidate",
+                            position=position_rej,
+                            company_name=company_name_rej,
+                            hr_name=hr_name_rej,
+                            additional_message=additional_message
+                        )
+                        
+                        email_tasks = [
+                            {
                                 'to': email,
                                 'subject': template['subject'],
                                 'body': template['body'],
-                                'from_name': from_name_rej
-                            })
+                                'from_name': from_name_rej,
+                                'content_type': template.get('content_type')
+                            }
+                            for email in selected_emails_rej
+                        ]
                         
                         # Send emails with progress tracking
                         with st.spinner("Sending emails..."):
@@ -486,7 +631,7 @@ Best regards,
                 st.subheader("📧 Select Recipients")
                 selected_emails_custom = st.multiselect(
                     "Choose email addresses",
-                    st.session_state.extracted_emails,
+                    sorted_emails(),
                     key="custom_emails"
                 )
                 
@@ -498,6 +643,8 @@ Best regards,
                     elif not selected_emails_custom:
                         st.error("❌ Please select at least one recipient")
                     else:
+                        from email_sender import EmailTemplates
+                        
                         variables = {
                             'candidate_name': var_candidate,
                             'position': var_position,
@@ -505,20 +652,23 @@ Best regards,
                             'hr_name': var_hr
                         }
                         
-                        email_tasks = []
-                        for email in selected_emails_custom:
-                            template = EmailTemplates.custom_email(
-                                subject=subject_custom,
-                                body=body_custom,
-                                variables=variables
-                            )
-                            
-                            email_tasks.append({
+                        # Same content for every recipient, so render it once
+                        template = EmailTemplates.custom_email(
+                            subject=subject_custom,
+                            body=body_custom,
+                            variables=variables
+                        )
+                        
+                        email_tasks = [
+                            {
                                 'to': email,
                                 'subject': template['subject'],
                                 'body': template['body'],
-                                'from_name': from_name_custom
-                            })
+                                'from_name': from_name_custom,
+                                'content_type': template.get('content_type')
+                            }
+                            for email in selected_emails_custom
+                        ]
                         
                         # Send emails with progress tracking
                         with st.spinner("Sending emails..."):
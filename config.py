@@ -1,31 +1,88 @@
 """Configuration management for the email automation system."""
 import os
+from dataclasses import dataclass
+from typing import FrozenSet
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Application configuration."""
-    
+    """Application configuration, loaded once from the environment."""
+
     # SMTP Settings
-    SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
-    SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
-    SMTP_USER = os.getenv('SMTP_USER', '')
-    SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
-    
+    SMTP_HOST: str
+    SMTP_PORT: int
+    SMTP_USER: str
+    SMTP_PASSWORD: str
+    IMAP_HOST: str
+    # Copy sent mail into the IMAP Sent folder; Gmail and Microsoft 365 already file SMTP submissions there
+    SAVE_TO_SENT: bool
+    # Reusable SMTP sessions shared by concurrent senders, and how long one may sit unused
+    SMTP_POOL_SIZE: int
+    SMTP_POOL_IDLE_TIMEOUT: float
+
+    # RabbitMQ Settings
+    RABBITMQ_HOST: str
+    RABBITMQ_PORT: int
+    RABBITMQ_USER: str
+    RABBITMQ_PASSWORD: str
+    RABBITMQ_QUEUE: str
+    # Shards > 1 publish through a consistent-hash exchange (needs rabbitmq_consistent_hash_exchange)
+    RABBITMQ_SHARD_COUNT: int
+    RABBITMQ_EXCHANGE: str
+    # Shard on the full 'recipient' address or on its 'domain', keeping each destination on one consumer
+    RABBITMQ_SHARD_BY: str
+    # Unacked deliveries buffered per consumer; above SMTP_POOL_SIZE so senders never wait on the broker
+    CONSUMER_PREFETCH: int
+
     # Application Settings
-    MAX_RETRIES = int(os.getenv('MAX_RETRIES', 3))
-    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 10))
-    PROCESSING_DELAY = float(os.getenv('PROCESSING_DELAY', 2.0))
-    
+    MAX_RETRIES: int
+    EMAIL_BATCH_SIZE: int
+    PROCESSING_DELAY: float
+    CONCURRENCY: int
+    # Provider send ceiling for direct SMTP sends (Gmail allows roughly 60-100/min)
+    MSGS_PER_MIN: float
+
     # Upload Settings
-    UPLOAD_FOLDER = 'uploads'
-    ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'zip'}
-    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
-    
-    @staticmethod
-    def validate():
+    UPLOAD_FOLDER: str = 'uploads'
+    ALLOWED_EXTENSIONS: FrozenSet[str] = frozenset({'pdf', 'doc', 'docx', 'zip'})
+    MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+
+    def validate(self):
         """Validate essential configuration."""
-        if not Config.SMTP_USER or not Config.SMTP_PASSWORD:
+        if not self.SMTP_USER or not self.SMTP_PASSWORD:
             raise ValueError("SMTP credentials not configured. Please set SMTP_USER and SMTP_PASSWORD in .env file")
         return True
+
+
+def load() -> Config:
+    """Read and parse configuration from the environment."""
+    return Config(
+        SMTP_HOST=os.getenv('SMTP_HOST', 'smtp.gmail.com'),
+        SMTP_PORT=int(os.getenv('SMTP_PORT', 587)),
+        SMTP_USER=os.getenv('SMTP_USER', ''),
+        SMTP_PASSWORD=os.getenv('SMTP_PASSWORD', ''),
+        IMAP_HOST=os.getenv('IMAP_HOST', 'imap.gmail.com'),
+        SAVE_TO_SENT=os.getenv('SAVE_TO_SENT', 'true').lower() == 'true',
+        SMTP_POOL_SIZE=int(os.getenv('SMTP_POOL_SIZE', 5)),
+        SMTP_POOL_IDLE_TIMEOUT=float(os.getenv('SMTP_POOL_IDLE_TIMEOUT', 60)),
+        RABBITMQ_HOST=os.getenv('RABBITMQ_HOST', 'localhost'),
+        RABBITMQ_PORT=int(os.getenv('RABBITMQ_PORT', 5672)),
+        RABBITMQ_USER=os.getenv('RABBITMQ_USER', 'guest'),
+        RABBITMQ_PASSWORD=os.getenv('RABBITMQ_PASSWORD', 'guest'),
+        RABBITMQ_QUEUE=os.getenv('RABBITMQ_QUEUE', 'email_queue'),
+        RABBITMQ_SHARD_COUNT=int(os.getenv('RABBITMQ_SHARD_COUNT', 1)),
+        RABBITMQ_EXCHANGE=os.getenv('RABBITMQ_EXCHANGE', 'emails.ch'),
+        RABBITMQ_SHARD_BY=os.getenv('RABBITMQ_SHARD_BY', 'recipient').lower(),
+        CONSUMER_PREFETCH=int(os.getenv('CONSUMER_PREFETCH', 10)),
+        MAX_RETRIES=int(os.getenv('MAX_RETRIES', 3)),
+        EMAIL_BATCH_SIZE=int(os.getenv('EMAIL_BATCH_SIZE', 10)),
+        PROCESSING_DELAY=float(os.getenv('PROCESSING_DELAY', 2.0)),
+        CONCURRENCY=int(os.getenv('CONCURRENCY', 5)),
+        MSGS_PER_MIN=float(os.getenv('MSGS_PER_MIN', 60)),
+    )
+
+
+CONFIG = load()
@@ -2,115 +2,367 @@
 import re
 import os
 import zipfile
-import tempfile
-from typing import List, Set
+import io
+import json
+import hashlib
+import time
+from functools import lru_cache
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+)
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, BinaryIO, Union
 import PyPDF2
 import pdfplumber
-from docx import Document
+from xml.etree import ElementTree
 from pathlib import Path
 import logging
+from config import CONFIG
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Comprehensive email regex pattern, compiled once and shared by every parse.
+# Each domain label is matched exactly once, so the engine never backtracks
+# across '.'; a trailing sentence full stop is still allowed after the TLD.
+EMAIL_PATTERN = (
+    r'(?<![\w.+-])[A-Za-z0-9_%+-](?:[A-Za-z0-9._%+-]{0,62}[A-Za-z0-9_%+-])?'
+    r'@(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,24}'
+    r'(?![\w-]|\.[A-Za-z0-9])'
+)
+_EMAIL_RE = re.compile(EMAIL_PATTERN)
+
+# Optional google-re2 (DFA, linear time) for the bulk scan. RE2 has no lookaround,
+# so it finds loose candidates that are then confirmed against _EMAIL_RE.
+try:
+    import re2
+    
+    _re2_options = re2.Options()
+    _re2_options.max_mem = 8 << 20
+    _EMAIL_RE2 = re2.compile(
+        r'[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,24}', _re2_options
+    )
+except ImportError:
+    _EMAIL_RE2 = None
+
+
+# A match spans at most a 64-char local part before the '@'; domains rarely exceed 255
+_WINDOW_BEFORE = 64
+_WINDOW_AFTER = 256
+
+
+def find_emails(text: str) -> List[str]:
+    """Return every email-like match in text, using re2 when it is installed."""
+    # str.find is a memchr scan; most pages have no '@' and never reach the regex
+    at = text.find('@')
+    if at == -1:
+        return []
+    
+    if _EMAIL_RE2 is not None:
+        # Confirm each candidate in place so the boundary lookarounds see its neighbours.
+        # The loose local part can swallow leading characters _EMAIL_RE would not start
+        # on, so later starts up to the local-part limit are tried too. Any candidate
+        # that still fails means text re2 consumed may hold a different match, so the
+        # whole text is rescanned with re to keep results identical to it.
+        matches = []
+        for candidate in _EMAIL_RE2.finditer(text):
+            end = candidate.end()
+            at_candidate = text.index('@', candidate.start(), end)
+            for start in range(max(candidate.start(), at_candidate - _WINDOW_BEFORE), at_candidate):
+                found = _EMAIL_RE.match(text, start)
+                if found is not None and found.end() == end:
+                    matches.append(found.group())
+                    break
+            else:
+                break
+        else:
+            return matches
+    
+    # Anchor on each '@'. A local part cannot contain a space, so a single anchored
+    # match from just after the last space before it usually settles that '@';
+    # anything else falls back to scanning the window around it.
+    matches = []
+    text_len = len(text)
+    last_end = 0
+    while at != -1:
+        start = max(last_end, at - _WINDOW_BEFORE)
+        end = min(text_len, at + _WINDOW_AFTER)
+        
+        found = _EMAIL_RE.match(text, text.rfind(' ', start, at) + 1 or start, end)
+        if found is None or found.end() <= at:
+            found = None
+            # Lookbehind still sees text before start
+            for match in _EMAIL_RE.finditer(text, start, end):
+                if match.start() <= at < match.end():
+                    found = match
+                    break
+        
+        # A match cut off at the window end is dropped
+        if found is not None and (found.end() < end or end == text_len):
+            matches.append(found.group())
+            last_end = found.end()
+        at = text.find('@', max(at + 1, last_end))
+    return matches
+
+
+# ZIP entries are read ahead of parsing, at most this many buffered at once
+_ZIP_READ_AHEAD = 32
+_ZIP_PARSE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Parse results are cached on disk so re-importing the same CVs skips parsing
+_CACHE_DIR = Path(CONFIG.UPLOAD_FOLDER) / '.cvcache'
+_CACHE_READ_CHUNK = 1 << 20
+
+# Part of every cache key; bump it whenever extraction changes so stale results are not reused
+_PARSER_VERSION = 1
+
+# Cached addresses are personal data: entries expire after a week and the newest are kept
+_CACHE_MAX_AGE = 7 * 24 * 3600
+_CACHE_MAX_ENTRIES = 5000
+_cache_pruned = False
+
+
+def _content_key(file_path: str, size: int) -> str:
+    """Key a file by its type, size and a blake2b of its full contents, read in chunks."""
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CACHE_READ_CHUNK), b''):
+            digest.update(chunk)
+    return f"v{_PARSER_VERSION}-{Path(file_path).suffix.lower().lstrip('.')}-{digest.hexdigest()}"
+
+
+def _bytes_key(data: bytes, filename: str) -> str:
+    """Key an in-memory document by its type and a blake2b of its full contents."""
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f"v{_PARSER_VERSION}-{Path(filename).suffix.lower().lstrip('.')}-{digest}"
+
+
+def _zip_entry_key(info: zipfile.ZipInfo) -> str:
+    """Key a ZIP entry by the CRC32 and size already stored in the archive directory."""
+    suffix = Path(info.filename).suffix.lower().lstrip('.')
+    return f"v{_PARSER_VERSION}-{suffix}-{info.CRC:08x}-{info.file_size}"
+
+
+def _prune_cache():
+    """Once per process, delete expired entries and all but the newest _CACHE_MAX_ENTRIES."""
+    global _cache_pruned
+    if _cache_pruned:
+        return
+    _cache_pruned = True
+    
+    try:
+        entries = sorted(
+            ((entry.stat().st_mtime, entry.path) for entry in os.scandir(_CACHE_DIR)
+             if entry.name.endswith('.json')),
+            reverse=True
+        )
+    except OSError:
+        return
+    
+    cutoff = time.time() - _CACHE_MAX_AGE
+    for idx, (mtime, path) in enumerate(entries):
+        if idx >= _CACHE_MAX_ENTRIES or mtime < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _load_cached(key: str) -> Optional[Set[str]]:
+    """Return cached emails for a key, or None if not cached."""
+    _prune_cache()
+    try:
+        with open(_CACHE_DIR / f"{key}.json", 'r', encoding='utf-8') as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached(key: str, emails: Set[str]):
+    """
+    Persist extracted emails under a key.
+    
+    Empty results are not stored: extractors log and swallow parse errors,
+    so an empty set may be a failure that deserves a retry next time.
+    """
+    if not emails:
+        return
+    _prune_cache()
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(_CACHE_DIR / f"{key}.json", 'w', encoding='utf-8') as f:
+            json.dump(sorted(emails), f)
+    except OSError as e:
+        logger.warning(f"Could not write parse cache: {e}")
+
+
+@lru_cache(maxsize=4096)
+def _process_file_cached(file_path: str, mtime_ns: int, size: int) -> frozenset:
+    """In-process memo for process_file; mtime and size invalidate stale entries."""
+    key = _content_key(file_path, size)
+    emails = _load_cached(key)
+    if emails is None:
+        emails = CVParser.parse_file(file_path)
+        _store_cached(key, emails)
+    return frozenset(emails)
+
+
+# WordprocessingML tags read straight from word/document.xml
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = f'{_W_NS}p'
+_W_T = f'{_W_NS}t'
+_W_BREAKS = {f'{_W_NS}tab': '\t', f'{_W_NS}br': '\n', f'{_W_NS}cr': '\n'}
+
+
+def _docx_paragraphs(file_path: Union[str, BinaryIO]) -> Iterator[str]:
+    """Yield the text of each paragraph (body and table cells) of a .docx without building a Document."""
+    with zipfile.ZipFile(file_path) as docx, docx.open('word/document.xml') as xml:
+        for _, element in ElementTree.iterparse(xml):
+            if element.tag != _W_P:
+                continue
+            
+            parts = []
+            for node in element.iter():
+                if node.tag == _W_T:
+                    parts.append(node.text or '')
+                elif node.tag in _W_BREAKS:
+                    parts.append(_W_BREAKS[node.tag])
+            yield ''.join(parts)
+            # Nested paragraphs (text boxes) are cleared first, so none is read twice
+            element.clear()
+
+
+# Placeholder domains that show up in CV templates rather than real addresses
+_BAD_DOMAINS = frozenset({'example.com', 'test.com', 'domain.com', 'localhost', 'email.com'})
+
 
 class CVParser:
     """Extract email addresses from various document formats."""
     
-    # Comprehensive email regex pattern
-    EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    EMAIL_PATTERN = EMAIL_PATTERN
     
     @staticmethod
     def extract_emails_from_text(text: str) -> Set[str]:
         """Extract email addresses from text using regex."""
-        emails = set(re.findall(CVParser.EMAIL_PATTERN, text))
+        emails = set(find_emails(text))
         # Filter out common false positives
-        valid_emails = {
-            email.lower() for email in emails 
-            if not any(exclude in email.lower() for exclude in ['example.com', 'test.com', 'domain.com'])
-        }
+        valid_emails = set()
+        for email in emails:
+            email = email.lower()
+            if email.rpartition('@')[2] not in _BAD_DOMAINS:
+                valid_emails.add(email)
         return valid_emails
     
     @staticmethod
-    def extract_from_pdf(file_path: str) -> Set[str]:
-        """Extract emails from PDF files using multiple methods."""
-        emails = set()
+    def extract_from_txt(file_path: Union[str, BinaryIO]) -> Set[str]:
+        """Extract emails from a plain-text file (path or binary stream)."""
+        if isinstance(file_path, str):
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return CVParser.extract_emails_from_text(f.read())
+        return CVParser.extract_emails_from_text(file_path.read().decode('utf-8', errors='ignore'))
+    
+    @staticmethod
+    def extract_from_pdf(file_path: Union[str, BinaryIO]) -> Set[str]:
+        """
+        Extract emails from PDF files (path or seekable binary stream).
         
-        # Method 1: PyPDF2
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        emails.update(CVParser.extract_emails_from_text(text))
-        except Exception as e:
-            logger.warning(f"PyPDF2 extraction failed for {file_path}: {e}")
+        pdfplumber is tried first; PyPDF2 only runs if it fails or finds nothing.
+        """
+        # Page texts are joined and scanned in one pass per engine
+        pages = []
         
-        # Method 2: pdfplumber (more accurate for complex PDFs)
+        # Method 1: pdfplumber (more accurate for complex PDFs)
         try:
             with pdfplumber.open(file_path) as pdf:
                 for page in pdf.pages:
                     text = page.extract_text()
-                    if text:
-                        emails.update(CVParser.extract_emails_from_text(text))
+                    # Most CV pages carry no address at all; don't keep them
+                    if text and '@' in text:
+                        pages.append(text)
         except Exception as e:
             logger.warning(f"pdfplumber extraction failed for {file_path}: {e}")
+        emails = CVParser.extract_emails_from_text('\n'.join(pages))
+        
+        # Method 2: PyPDF2 fallback
+        if not emails:
+            if not isinstance(file_path, str):
+                file_path.seek(0)
+            pages = []
+            try:
+                pdf_reader = PyPDF2.PdfReader(file_path)
+                for page in pdf_reader.pages:
+                    text = page.extract_text()
+                    if text and '@' in text:
+                        pages.append(text)
+            except Exception as e:
+                logger.warning(f"PyPDF2 extraction failed for {file_path}: {e}")
+            emails = CVParser.extract_emails_from_text('\n'.join(pages))
         
         logger.info(f"Extracted {len(emails)} emails from PDF: {file_path}")
         return emails
     
     @staticmethod
-    def extract_from_word(file_path: str) -> Set[str]:
-        """Extract emails from Word documents (.doc, .docx)."""
+    def extract_from_word(file_path: Union[str, BinaryIO]) -> Set[str]:
+        """Extract emails from Word documents (.docx; legacy .doc is not supported)."""
         emails = set()
         
         try:
-            doc = Document(file_path)
-            
-            # Extract from paragraphs
-            for paragraph in doc.paragraphs:
-                emails.update(CVParser.extract_emails_from_text(paragraph.text))
-            
-            # Extract from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        emails.update(CVParser.extract_emails_from_text(cell.text))
+            # One regex pass over the whole document instead of one per paragraph
+            emails = CVParser.extract_emails_from_text('\n'.join(_docx_paragraphs(file_path)))
             
             logger.info(f"Extracted {len(emails)} emails from Word: {file_path}")
+        except zipfile.BadZipFile:
+            logger.warning(f"Not a .docx file (legacy .doc is not supported): {file_path}")
         except Exception as e:
             logger.error(f"Error extracting from Word document {file_path}: {e}")
         
         return emails
     
     @staticmethod
-    def extract_from_zip(file_path: str) -> Set[str]:
+    def extract_from_zip(file_path: Union[str, BinaryIO]) -> Set[str]:
         """Extract emails from all supported files within a ZIP archive."""
         emails = set()
         
         try:
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                # Create temporary directory for extraction
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    zip_ref.extractall(temp_dir)
+            with zipfile.ZipFile(file_path, 'r') as zip_ref, \
+                    ThreadPoolExecutor(max_workers=_ZIP_PARSE_WORKERS) as executor:
+                pending = {}
+                
+                # Read (and inflate) entries here while earlier ones are parsed on the pool
+                for info in zip_ref.infolist():
+                    if info.is_dir():
+                        continue
+                    
+                    file_ext = Path(info.filename).suffix.lower()
+                    # Nested archives are not expanded
+                    if file_ext not in _DISPATCH or file_ext == '.zip':
+                        continue
+                    
+                    key = _zip_entry_key(info)
+                    cached = _load_cached(key)
+                    if cached is not None:
+                        emails.update(cached)
+                        continue
+                    
+                    try:
+                        with zip_ref.open(info) as entry:
+                            data = entry.read()
+                    except Exception as e:
+                        logger.warning(f"Failed to process {info.filename} in ZIP: {e}")
+                        continue
                     
-                    # Process all files in the extracted directory
-                    for root, _, files in os.walk(temp_dir):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            file_ext = Path(file).suffix.lower()
-                            
-                            try:
-                                if file_ext == '.pdf':
-                                    emails.update(CVParser.extract_from_pdf(file_path))
-                                elif file_ext in ['.doc', '.docx']:
-                                    emails.update(CVParser.extract_from_word(file_path))
-                                elif file_ext == '.txt':
-                                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                        emails.update(CVParser.extract_emails_from_text(f.read()))
-                            except Exception as e:
-                                logger.warning(f"Failed to process {file} in ZIP: {e}")
+                    pending[executor.submit(CVParser.process_bytes, data, info.filename)] = key
+                    
+                    # Bound read-ahead so a large archive is never held in memory whole
+                    if len(pending) >= _ZIP_READ_AHEAD:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            entry_emails = future.result()
+                            _store_cached(pending.pop(future), entry_emails)
+                            emails.update(entry_emails)
+                
+                for future in as_completed(pending):
+                    entry_emails = future.result()
+                    _store_cached(pending[future], entry_emails)
+                    emails.update(entry_emails)
             
             logger.info(f"Extracted {len(emails)} emails from ZIP: {file_path}")
         except Exception as e:
@@ -120,49 +372,137 @@ class CVParser:
     
     @staticmethod
     def process_file(file_path: str) -> Set[str]:
-        """Process a single file and extract emails based on file type."""
+        """Process a single file, reusing cached results for unchanged content."""
         file_ext = Path(file_path).suffix.lower()
+        if file_ext not in _DISPATCH:
+            logger.warning(f"Unsupported file type: {file_ext}")
+            return set()
         
-        if file_ext == '.pdf':
-            return CVParser.extract_from_pdf(file_path)
-        elif file_ext in ['.doc', '.docx']:
-            return CVParser.extract_from_word(file_path)
-        elif file_ext == '.zip':
-            return CVParser.extract_from_zip(file_path)
-        elif file_ext == '.txt':
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                return CVParser.extract_emails_from_text(f.read())
-        else:
+        stat = os.stat(file_path)
+        return set(_process_file_cached(file_path, stat.st_mtime_ns, stat.st_size))
+    
+    @staticmethod
+    def parse_file(file_path: str) -> Set[str]:
+        """Parse a single file and extract emails based on file type, bypassing the cache."""
+        file_ext = Path(file_path).suffix.lower()
+        
+        extractor = _DISPATCH.get(file_ext)
+        if extractor is None:
             logger.warning(f"Unsupported file type: {file_ext}")
             return set()
+        return extractor(file_path)
     
     @staticmethod
-    def process_multiple_files(file_paths: List[str]) -> List[dict]:
+    def process_bytes(data: bytes, filename: str) -> Set[str]:
         """
-        Process multiple files and return structured results.
+        Process an in-memory document without writing it to disk.
+        
+        Args:
+            data: Raw file contents
+            filename: Original file name, used to pick the parser
+        """
+        file_ext = Path(filename).suffix.lower()
+        
+        extractor = _DISPATCH.get(file_ext)
+        if extractor is None:
+            logger.warning(f"Unsupported file type: {file_ext}")
+            return set()
+        
+        try:
+            return extractor(io.BytesIO(data))
+        except Exception as e:
+            logger.warning(f"Failed to process {filename}: {e}")
+            return set()
+    
+    @staticmethod
+    def process_upload(data: bytes, filename: str) -> Set[str]:
+        """
+        Process an uploaded document, caching the result on disk by content.
+        
+        Uploads have no stable path for process_file's cache, so the key is
+        a hash of the bytes instead.
+        
+        Args:
+            data: Raw file contents
+            filename: Original file name, used to pick the parser
+        """
+        key = _bytes_key(data, filename)
+        emails = _load_cached(key)
+        if emails is None:
+            emails = CVParser.process_bytes(data, filename)
+            _store_cached(key, emails)
+        return emails
+    
+    @staticmethod
+    def process_stream(stream: BinaryIO, name: str) -> Set[str]:
+        """
+        Process a file-like object (e.g. a ZIP entry) without writing it to disk.
+        
+        PDF and Word parsers seek heavily, so the single document is read
+        into memory and handed to process_bytes.
+        """
+        return CVParser.process_bytes(stream.read(), name)
+    
+    @staticmethod
+    def iter_process(file_paths: List[str]) -> Iterator[dict]:
+        """
+        Process files in parallel and yield one result per file as it completes.
         
         Returns:
-            List of dicts with 'file', 'emails', and 'count' keys
+            Iterator of dicts with 'file', 'emails' (a set), and 'count' keys,
+            plus 'error' for files that could not be processed
         """
-        results = []
+        # Files are independent and parsing is CPU-bound, so fan out across cores
+        max_workers = min(os.cpu_count() or 1, len(file_paths)) or 1
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(CVParser.process_file, file_path): file_path
+                for file_path in file_paths
+            }
+            
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    emails = future.result()
+                    yield {
+                        'file': Path(file_path).name,
+                        'emails': emails,
+                        'count': len(emails)
+                    }
+                except Exception as e:
+                    logger.error(f"Error processing {file_path}: {e}")
+                    yield {
+                        'file': Path(file_path).name,
+                        'emails': set(),
+                        'count': 0,
+                        'error': str(e)
+                    }
+    
+    @staticmethod
+    def aggregate(results: Iterable[dict]) -> Set[str]:
+        """Union the emails of per-file results from iter_process."""
         all_emails = set()
+        for result in results:
+            all_emails |= result['emails']
+        return all_emails
+    
+    @staticmethod
+    def process_multiple_files(file_paths: List[str]) -> Tuple[List[dict], List[str]]:
+        """
+        Process multiple files and return structured results.
         
-        for file_path in file_paths:
-            try:
-                emails = CVParser.process_file(file_path)
-                all_emails.update(emails)
-                results.append({
-                    'file': Path(file_path).name,
-                    'emails': list(emails),
-                    'count': len(emails)
-                })
-            except Exception as e:
-                logger.error(f"Error processing {file_path}: {e}")
-                results.append({
-                    'file': Path(file_path).name,
-                    'emails': [],
-                    'count': 0,
-                    'error': str(e)
-                })
-        
-        return results, list(all_emails)
+        Returns:
+            Tuple of (per-file dicts in completion order, list of all unique emails)
+        """
+        results = list(CVParser.iter_process(file_paths))
+        return results, list(CVParser.aggregate(results))
+
+
+# Extension -> extractor; every entry accepts a path or a binary stream
+_DISPATCH = {
+    '.pdf': CVParser.extract_from_pdf,
+    '.doc': CVParser.extract_from_word,
+    '.docx': CVParser.extract_from_word,
+    '.txt': CVParser.extract_from_txt,
+    '.zip': CVParser.extract_from_zip,
+}
@@ -1,29 +1,242 @@
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import re
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Iterable, Tuple, Union
 import logging
+from html import escape
+from string import Template
 import imaplib
-from config import Config
+import threading
+import queue
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.message import Message
+from config import CONFIG
+
+# Optional: concurrent delivery over several async SMTP sessions
+try:
+    import aiosmtplib
+except ImportError:
+    aiosmtplib = None
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds a bulk-send connection may sit idle before it is probed with NOOP
+SMTP_IDLE_CHECK = 30
+
+# Seconds send_email waits for a free pooled session before giving up
+SMTP_POOL_WAIT_TIMEOUT = 30
+
+# Common Sent folder names by provider, matched case-insensitively
+_SENT_NAMES = frozenset(name.lower() for name in (
+    'Sent',
+    'Sent Items',
+    'Sent Mail',
+    '[Gmail]/Sent Mail',
+    'INBOX.Sent',
+    'Sent Messages',
+))
+
+# One IMAP LIST line: (flags) "delimiter"|NIL "quoted name"|atom
+_FOLDER_RE = re.compile(
+    rb'\((?P<flags>[^)]*)\)\s+(?:"(?P<delimiter>(?:[^"\\]|\\.)*)"|NIL)\s+'
+    rb'(?P<name>"(?:[^"\\]|\\.)*"|[^\s"]+)\s*$'
+)
+_QUOTED_SPECIALS_RE = re.compile(r'\\(.)')
+
+# Seconds a connection-test result is reused; rejected credentials are not retried for longer
+CONNECTION_TEST_TTL = 60
+AUTH_FAILURE_TTL = 300
+
+
+def _imap_quote(name: str) -> str:
+    """Quote a mailbox name for an IMAP command; imaplib sends arguments as-is."""
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+# English month names for INTERNALDATE; strftime's %b follows the locale
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _internaldate(now: float) -> str:
+    """Format a timestamp as a quoted IMAP INTERNALDATE, in UTC so no local-zone lookup is needed."""
+    t = time.gmtime(now)
+    return (f'"{t.tm_mday:02d}-{_MONTHS[t.tm_mon - 1]}-{t.tm_year} '
+            f'{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d} +0000"')
+
+
+@lru_cache(maxsize=16)
+def _body_part(body: str, content_type: Optional[str]) -> MIMEText:
+    """
+    Build the text part of a message, reusing it for every recipient of a campaign.
+    
+    Bulk sends repeat one rendered body, so it is encoded once; the part is
+    only ever read when its parent message is serialized.
+    """
+    # Support both plain text and HTML; only the head is checked when the caller did not say
+    if content_type is None:
+        head = body[:512].lower()
+        content_type = 'html' if '<html' in head or '<body' in head else 'plain'
+    # A fixed charset skips the ASCII trial encode and base64-encodes the body in C
+    return MIMEText(body, content_type, 'utf-8')
+
+
+class RateLimiter:
+    """Thread-safe token bucket that only blocks once the send rate is exceeded."""
+    
+    def __init__(self, rate: float, burst: int = 10):
+        """
+        Initialize the limiter.
+        
+        Args:
+            rate: Messages allowed per minute (0 or less disables limiting)
+            burst: Messages that may go out back-to-back before throttling
+        """
+        self.rate = rate / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, sleeping until it is available."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now so concurrent callers queue up behind each other
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _PooledSMTP:
+    """One pool slot: a lazily opened SMTP session and its usage counters."""
+    
+    __slots__ = ('server', 'msg_count', 'last_used')
+    
+    def __init__(self):
+        self.server: Optional[smtplib.SMTP] = None
+        self.msg_count = 0
+        self.last_used = 0.0
+    
+    def drop(self):
+        EmailSender._disconnect(self.server)
+        self.server = None
+
+
+class SMTPPool:
+    """Thread-safe pool of reusable, authenticated SMTP sessions."""
+    
+    def __init__(self, connect: Callable[[], smtplib.SMTP], size: int,
+                 max_messages: int, idle_timeout: float):
+        """
+        Initialize the pool; sessions are only opened when first acquired.
+        
+        Args:
+            connect: Factory returning a new authenticated session
+            size: Maximum number of concurrent sessions
+            max_messages: Messages sent on a session before it is rotated
+            idle_timeout: Seconds a session may sit unused before it is replaced
+        """
+        self._connect = connect
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        # LIFO hands out the most recently released, still-warm session first
+        self._slots = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._slots.put(_PooledSMTP())
+    
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Borrow a live session for one send.
+        
+        Socket-level errors inside the block discard the session; SMTP error
+        replies keep it, since smtplib resets the transaction itself.
+        
+        Raises:
+            queue.Empty: If no session frees up within timeout
+        """
+        slot = self._slots.get(timeout=timeout)
+        try:
+            if slot.server is not None:
+                idle = time.monotonic() - slot.last_used
+                if idle > self.idle_timeout or (
+                        idle > SMTP_IDLE_CHECK and not EmailSender._is_alive(slot.server)):
+                    slot.drop()
+            if slot.server is None:
+                slot.server = self._connect()
+                slot.msg_count = 0
+            
+            try:
+                yield slot.server
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                raise
+            except BaseException:
+                slot.drop()
+                raise
+            finally:
+                slot.last_used = time.monotonic()
+            
+            slot.msg_count += 1
+            if slot.msg_count >= self.max_messages:
+                slot.drop()
+        finally:
+            self._slots.put(slot)
+    
+    def close(self):
+        """Quit every idle session; sessions in use are closed when next rotated."""
+        slots = []
+        while True:
+            try:
+                slots.append(self._slots.get_nowait())
+            except queue.Empty:
+                break
+        for slot in slots:
+            slot.drop()
+            self._slots.put(slot)
+
 
 class EmailSender:
     """Handle email sending via SMTP."""
     
     def __init__(self):
         """Initialize email sender with SMTP configuration."""
-        self.smtp_host = Config.SMTP_HOST
-        self.smtp_port = Config.SMTP_PORT
-        self.smtp_user = Config.SMTP_USER
-        self.smtp_password = Config.SMTP_PASSWORD
-        self.max_retries = Config.MAX_RETRIES
+        self.smtp_host = CONFIG.SMTP_HOST
+        self.smtp_port = CONFIG.SMTP_PORT
+        self.smtp_user = CONFIG.SMTP_USER
+        self.smtp_password = CONFIG.SMTP_PASSWORD
+        self.max_retries = CONFIG.MAX_RETRIES
+        # (expires_at, result) of the last test_connection call
+        self._last_test: Optional[Tuple[float, bool]] = None
+        # Sessions reused by send_email across calls and threads (e.g. queue messages)
+        self.pool = SMTPPool(
+            self._connect,
+            size=CONFIG.SMTP_POOL_SIZE,
+            max_messages=CONFIG.EMAIL_BATCH_SIZE,
+            idle_timeout=CONFIG.SMTP_POOL_IDLE_TIMEOUT
+        )
+        # IMAP session reused to copy every sent message into the Sent folder
+        self._imap: Optional[imaplib.IMAP4_SSL] = None
+        self._imap_last_used = 0.0
+        self._imap_lock = threading.Lock()
+        self._sent_folder: Optional[str] = None
+        # Sent-folder APPENDs run here so sends return as soon as SMTP accepts them
+        self._sent_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='imap-append')
+        # aiosmtplib sessions shared by send_email_async; created on the loop that first sends
+        self._async_slots: Optional[asyncio.Queue] = None
     
     def create_email(self, to_email: str, subject: str, body: str, 
-                     from_name: Optional[str] = None) -> MIMEMultipart:
+                     from_name: Optional[str] = None,
+                     content_type: Optional[str] = None) -> MIMEMultipart:
         """
         Create an email message.
         
@@ -32,6 +245,7 @@ class EmailSender:
             subject: Email subject
             body: Email body (HTML supported)
             from_name: Optional sender name
+            content_type: 'html' or 'plain'; sniffed from the start of the body if omitted
         
         Returns:
             MIMEMultipart message object
@@ -45,102 +259,209 @@ class EmailSender:
         else:
             msg['From'] = self.smtp_user
         
-        # Support both plain text and HTML
-        if '<html>' in body.lower() or '<body>' in body.lower():
-            msg.attach(MIMEText(body, 'html'))
-        else:
-            msg.attach(MIMEText(body, 'plain'))
+        msg.attach(_body_part(body, content_type))
         
         return msg
     
+    def _connect(self) -> smtplib.SMTP:
+        """Open an authenticated SMTP connection."""
+        # Use SMTP_SSL for port 465, SMTP with starttls for port 587
+        if self.smtp_port == 465:
+            # SSL connection
+            server = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=10)
+        else:
+            # TLS connection (port 587 or 25)
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=10)
+            server.starttls()
+        try:
+            server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    @staticmethod
+    def _disconnect(server: Optional[smtplib.SMTP]):
+        """Close an SMTP connection, ignoring errors from a dead socket."""
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+    
+    @staticmethod
+    def _folder_name(match: re.Match) -> str:
+        """Decode the mailbox name from a _FOLDER_RE match, unquoting it if needed."""
+        name = match.group('name').decode('utf-8', 'replace')
+        if name.startswith('"'):
+            name = _QUOTED_SPECIALS_RE.sub(r'\1', name[1:-1])
+        return name
+    
     def _find_sent_folder(self, imap):
         """Find the correct Sent folder name for the email provider."""
         try:
+            # With LIST-EXTENDED, RFC 6154 lets the server return just the special-use folders
+            if 'SPECIAL-USE' in imap.capabilities and 'LIST-EXTENDED' in imap.capabilities:
+                status, folders = imap.list('(SPECIAL-USE) ""', '*')
+                if status == 'OK':
+                    for folder_data in folders:
+                        match = _FOLDER_RE.match(folder_data) if isinstance(folder_data, bytes) else None
+                        if match and b'\\sent' in match.group('flags').lower().split():
+                            return self._folder_name(match)
+            
             # List all folders
             status, folders = imap.list()
             if status != 'OK':
                 return None
             
-            # Common Sent folder names by provider
-            sent_variations = [
-                'Sent',
-                'Sent Items',
-                'Sent Mail',
-                '[Gmail]/Sent Mail',
-                'INBOX.Sent',
-                'Sent Messages',
-            ]
-            
-            # Decode folder names and look for Sent folder
+            fallback = None
             for folder_data in folders:
-                folder_str = folder_data.decode() if isinstance(folder_data, bytes) else str(folder_data)
+                # Literal-form names come back as tuples; no provider uses them for Sent
+                if not isinstance(folder_data, bytes):
+                    continue
+                match = _FOLDER_RE.match(folder_data)
+                if match is None:
+                    continue
                 
-                # Check each variation
-                for sent_name in sent_variations:
-                    if sent_name in folder_str:
-                        # Extract the actual folder name (handling quoted names)
-                        if '"' in folder_str:
-                            # Format: (flags) "delimiter" "folder name"
-                            parts = folder_str.split('"')
-                            if len(parts) >= 4:
-                                return parts[-2]
-                        return sent_name
+                name = self._folder_name(match)
+                
+                # RFC 6154 SPECIAL-USE flag names the folder outright
+                if b'\\sent' in match.group('flags').lower().split():
+                    return name
+                
+                if fallback is None:
+                    delimiter = match.group('delimiter')
+                    leaf = name.rsplit(delimiter.decode(), 1)[-1] if delimiter else name
+                    if name.lower() in _SENT_NAMES or leaf.lower() in _SENT_NAMES:
+                        fallback = name
             
-            return None
+            return fallback
             
         except Exception as e:
             logger.error(f"Error finding Sent folder: {e}")
             return None
     
-    def save_to_sent_folder(self, msg):
-        """Save sent message to IMAP Sent folder."""
+    def _get_imap(self) -> imaplib.IMAP4_SSL:
+        """Return the reusable IMAP session, reconnecting if it was dropped or went stale."""
+        if self._imap is not None and time.monotonic() - self._imap_last_used > SMTP_IDLE_CHECK:
+            try:
+                self._imap.noop()
+            except (imaplib.IMAP4.abort, OSError):
+                self._drop_imap()
+        
+        if self._imap is None:
+            imap = imaplib.IMAP4_SSL(CONFIG.IMAP_HOST)
+            try:
+                imap.login(self.smtp_user, self.smtp_password)
+            except Exception:
+                imap.shutdown()
+                raise
+            self._imap = imap
+            self._imap_last_used = time.monotonic()
+        return self._imap
+    
+    def _drop_imap(self):
+        """Log out of the reusable IMAP session, ignoring errors from a dead socket."""
+        if self._imap is None:
+            return
         try:
-            # Connect to IMAP server
-            imap = imaplib.IMAP4_SSL(Config.IMAP_HOST)
-            imap.login(self.smtp_user, self.smtp_password)
-
-            # Try to find the Sent folder (different providers use different names)
-            sent_folder = self._find_sent_folder(imap)
-            
-            if not sent_folder:
-                logger.warning("Could not find Sent folder, trying default 'Sent'")
-                sent_folder = 'Sent'
-
-            # Append the message to the Sent folder
-            # Format: folder_name, flags, date-time, message
-            result = imap.append(
-                sent_folder,
-                '\\Seen',  # Mark as read
-                imaplib.Time2Internaldate(time.time()),
-                msg.as_bytes()
-            )
-            
-            if result[0] == 'OK':
-                logger.info(f"Message saved to {sent_folder} folder")
-            else:
-                logger.error(f"Failed to save message: {result}")
-
-            imap.logout()
-            return True
-            
-        except imaplib.IMAP4.error as e:
-            logger.error(f"IMAP error saving to Sent folder: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Failed to save to Sent folder: {e}")
-            return False
+            self._imap.logout()
+        except Exception:
+            pass
+        self._imap = None
+    
+    def save_to_sent_folder_async(self, msg: Union[Message, bytes]) -> Future:
+        """
+        Queue a copy of a sent message for the Sent folder and return at once.
+        
+        A Message is serialized here, on the caller's thread, since Message
+        objects are not safe to share; one background thread does the APPENDs.
+        Senders pass the bytes they already handed to SMTP.
+        """
+        raw = msg if isinstance(msg, bytes) else msg.as_bytes()
+        return self._sent_executor.submit(self.save_to_sent_folder, raw)
+    
+    def _queue_sent_copy(self, raw: bytes):
+        """
+        Queue the Sent-folder copy of a delivered message, if enabled.
+        
+        Never raises: the message is already delivered, and reporting the send
+        as failed would get it retried and sent twice.
+        """
+        if not CONFIG.SAVE_TO_SENT:
+            return
+        try:
+            self.save_to_sent_folder_async(raw)
+        except RuntimeError as e:
+            # The executor refuses new work once close() has shut it down
+            logger.warning(f"Could not queue Sent folder copy: {e}")
+    
+    def save_to_sent_folder(self, msg: Union[Message, bytes]):
+        """Save sent message (or its serialized bytes) to IMAP Sent folder."""
+        raw = msg if isinstance(msg, bytes) else msg.as_bytes()
+        # One IMAP session serves every sender thread, one command at a time
+        with self._imap_lock:
+            for attempt in (1, 2):
+                try:
+                    imap = self._get_imap()
+                    
+                    # Find the Sent folder once (different providers use different names)
+                    if self._sent_folder is None:
+                        self._sent_folder = self._find_sent_folder(imap)
+                        if not self._sent_folder:
+                            logger.warning("Could not find Sent folder, trying default 'Sent'")
+                            self._sent_folder = 'Sent'
+                    sent_folder = self._sent_folder
+                    
+                    # Append the message to the Sent folder
+                    # Format: folder_name, flags, date-time, message
+                    result = imap.append(
+                        _imap_quote(sent_folder),
+                        '\\Seen',  # Mark as read
+                        _internaldate(time.time()),
+                        raw
+                    )
+                    self._imap_last_used = time.monotonic()
+                    
+                    if result[0] == 'OK':
+                        logger.debug("Message saved to %s folder", sent_folder)
+                    else:
+                        logger.error(f"Failed to save message: {result}")
+                        # The folder may have been renamed; look it up again next time
+                        self._sent_folder = None
+                    
+                    return True
+                    
+                except (imaplib.IMAP4.abort, OSError) as e:
+                    # The server dropped the session; reconnect once
+                    self._drop_imap()
+                    if attempt == 2:
+                        logger.error(f"Failed to save to Sent folder: {e}")
+                        return False
+                except imaplib.IMAP4.error as e:
+                    logger.error(f"IMAP error saving to Sent folder: {e}")
+                    return False
+                except Exception as e:
+                    logger.error(f"Failed to save to Sent folder: {e}")
+                    return False
     
     
     def send_email(self, email_data: Dict[str, Any]) -> bool:
         """
         Send an email via SMTP with retry logic.
         
+        Sessions come from self.pool, so concurrent callers each get their
+        own and each is rotated every CONFIG.EMAIL_BATCH_SIZE messages; call
+        close() when done.
+        
         Args:
             email_data: Dictionary containing:
                 - to: recipient email
                 - subject: email subject
                 - body: email body
                 - from_name: (optional) sender name
+                - content_type: (optional) 'html' or 'plain'
         
         Returns:
             True if email sent successfully, False otherwise
@@ -154,30 +475,20 @@ class EmailSender:
             logger.error("Missing required email fields")
             return False
         
-        # Create message first (outside retry loop)
-        msg = self.create_email(to_email, subject, body, from_name)
+        # Create and serialize the message once (outside retry loop); SMTP and IMAP share the bytes
+        msg = self.create_email(to_email, subject, body, from_name, email_data.get('content_type'))
+        raw = msg.as_bytes()
         
         # Retry logic for SMTP
         for attempt in range(1, self.max_retries + 1):
             try:
-                # Connect to SMTP server with timeout
-                # Use SMTP_SSL for port 465, SMTP with starttls for port 587
-                if self.smtp_port == 465:
-                    # SSL connection
-                    with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=10) as server:
-                        server.login(self.smtp_user, self.smtp_password)
-                        server.send_message(msg)
-                else:
-                    # TLS connection (port 587 or 25)
-                    with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=10) as server:
-                        server.starttls()
-                        server.login(self.smtp_user, self.smtp_password)
-                        server.send_message(msg)
+                with self.pool.acquire(timeout=SMTP_POOL_WAIT_TIMEOUT) as server:
+                    server.sendmail(self.smtp_user, [to_email], raw)
                 
-                logger.info(f"Email sent successfully to {to_email}")
+                logger.info("Email sent successfully to %s", to_email)
                 
-                # Save to Sent folder after successful send
-                self.save_to_sent_folder(msg)
+                # Save to Sent folder after successful send, off the critical path
+                self._queue_sent_copy(raw)
                 
                 return True
                 
@@ -196,34 +507,391 @@ class EmailSender:
         return False
     
     
+    def close(self):
+        """Release connections held between sends."""
+        self.pool.close()
+        # Flush queued Sent-folder copies before logging out
+        self._sent_executor.shutdown(wait=True)
+        with self._imap_lock:
+            self._drop_imap()
+    
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        """Check an idle connection with NOOP before reusing it."""
+        try:
+            return server.noop()[0] == 250
+        except OSError:
+            return False
+    
+    @staticmethod
+    def _is_transient(error: OSError) -> bool:
+        """Whether a send error is worth a reconnect and retry (drops, timeouts, 4xx replies)."""
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        return not isinstance(error, smtplib.SMTPException)
+    
+    def send_bulk(self, email_list: Iterable[Dict[str, Any]],
+                  progress_cb: Optional[Callable[[int], None]] = None,
+                  limiter: Optional[RateLimiter] = None) -> Tuple[int, int]:
+        """
+        Send many emails over one SMTP session.
+        
+        The connection is recycled every CONFIG.EMAIL_BATCH_SIZE messages to
+        stay under provider per-connection caps, and probed with NOOP after
+        SMTP_IDLE_CHECK idle seconds. Dropped connections and transient 4xx
+        replies reconnect with exponential backoff.
+        
+        Args:
+            email_list: Email dictionaries as accepted by send_email
+            progress_cb: Optional callback receiving the 1-based index of each processed email
+            limiter: Optional rate limiter consulted before each message
+        
+        Returns:
+            Tuple of (sent, failed) counts
+        """
+        sent = 0
+        failed = 0
+        server = None
+        messages_on_connection = 0
+        last_used = 0.0
+        
+        try:
+            for idx, email_data in enumerate(email_list, 1):
+                to_email = email_data.get('to')
+                subject = email_data.get('subject')
+                body = email_data.get('body')
+                
+                if not all([to_email, subject, body]):
+                    logger.error("Missing required email fields")
+                    failed += 1
+                else:
+                    raw = self.create_email(
+                        to_email, subject, body,
+                        email_data.get('from_name'), email_data.get('content_type')
+                    ).as_bytes()
+                    if limiter:
+                        limiter.acquire()
+                    
+                    for attempt in range(1, self.max_retries + 1):
+                        try:
+                            if server is not None and time.monotonic() - last_used > SMTP_IDLE_CHECK:
+                                # A slow producer or rate limit may have let the server drop us
+                                if not self._is_alive(server):
+                                    self._disconnect(server)
+                                    server = None
+                            
+                            if server is None or messages_on_connection >= CONFIG.EMAIL_BATCH_SIZE:
+                                self._disconnect(server)
+                                server = None
+                                server = self._connect()
+                                messages_on_connection = 0
+                            
+                            server.sendmail(self.smtp_user, [to_email], raw)
+                            last_used = time.monotonic()
+                            messages_on_connection += 1
+                            sent += 1
+                            logger.info("Email sent successfully to %s", to_email)
+                            self._queue_sent_copy(raw)
+                            break
+                        except OSError as e:
+                            # smtplib errors are OSError subclasses too
+                            if not self._is_transient(e) or attempt == self.max_retries:
+                                logger.error(f"Failed to send email to {to_email}: {e}")
+                                failed += 1
+                                break
+                            logger.warning(f"SMTP error on attempt {attempt}/{self.max_retries} for {to_email}: {e}")
+                            # Reconnect with exponential backoff
+                            self._disconnect(server)
+                            server = None
+                            time.sleep(2 ** (attempt - 1))
+                
+                if progress_cb:
+                    progress_cb(idx)
+        finally:
+            self._disconnect(server)
+        
+        return sent, failed
+    
+    async def _connect_async(self):
+        """Open an authenticated aiosmtplib connection."""
+        server = aiosmtplib.SMTP(
+            hostname=self.smtp_host,
+            port=self.smtp_port,
+            use_tls=self.smtp_port == 465,
+            start_tls=self.smtp_port != 465,
+            timeout=10
+        )
+        await server.connect()
+        try:
+            await server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    @staticmethod
+    async def _disconnect_async(server):
+        """Close an aiosmtplib connection, ignoring errors from a dead socket."""
+        if server is None:
+            return
+        try:
+            await server.quit()
+        except Exception:
+            server.close()
+    
+    @staticmethod
+    def _is_transient_async(error: Exception) -> bool:
+        """Whether an aiosmtplib error is worth retrying on a fresh connection."""
+        if isinstance(error, aiosmtplib.SMTPResponseException):
+            return 400 <= error.code < 500
+        return True
+    
+    async def send_email_async(self, email_data: Dict[str, Any]) -> bool:
+        """
+        Send an email from an event loop (requires aiosmtplib).
+        
+        Concurrent calls share up to CONFIG.SMTP_POOL_SIZE sessions, so many
+        conversations stay in flight on one thread. Sessions are rotated and
+        retried like send_email's; call close_async() on the same loop when done.
+        
+        Args:
+            email_data: Email dictionary as accepted by send_email
+        
+        Returns:
+            True if email sent successfully, False otherwise
+        """
+        if aiosmtplib is None:
+            raise RuntimeError("aiosmtplib is not installed")
+        
+        to_email = email_data.get('to')
+        subject = email_data.get('subject')
+        body = email_data.get('body')
+        
+        if not all([to_email, subject, body]):
+            logger.error("Missing required email fields")
+            return False
+        
+        raw = self.create_email(
+            to_email, subject, body,
+            email_data.get('from_name'), email_data.get('content_type')
+        ).as_bytes()
+        
+        if self._async_slots is None:
+            self._async_slots = asyncio.LifoQueue()
+            for _ in range(CONFIG.SMTP_POOL_SIZE):
+                self._async_slots.put_nowait(_PooledSMTP())
+        
+        slot = await self._async_slots.get()
+        try:
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    if slot.server is not None and (
+                            slot.msg_count >= CONFIG.EMAIL_BATCH_SIZE
+                            or time.monotonic() - slot.last_used > CONFIG.SMTP_POOL_IDLE_TIMEOUT):
+                        await self._disconnect_async(slot.server)
+                        slot.server = None
+                    if slot.server is None:
+                        slot.server = await self._connect_async()
+                        slot.msg_count = 0
+                    
+                    await slot.server.sendmail(self.smtp_user, [to_email], raw)
+                    slot.msg_count += 1
+                    slot.last_used = time.monotonic()
+                    logger.info("Email sent successfully to %s", to_email)
+                    # IMAP is blocking; the APPEND runs on the sender's background thread
+                    self._queue_sent_copy(raw)
+                    return True
+                except (aiosmtplib.SMTPException, OSError) as e:
+                    if not self._is_transient_async(e) or attempt == self.max_retries:
+                        logger.error(f"Failed to send email to {to_email}: {e}")
+                        return False
+                    logger.warning(f"SMTP error on attempt {attempt}/{self.max_retries} for {to_email}: {e}")
+                    await self._disconnect_async(slot.server)
+                    slot.server = None
+                    await asyncio.sleep(2 ** (attempt - 1))
+        finally:
+            self._async_slots.put_nowait(slot)
+        
+        return False
+    
+    async def close_async(self):
+        """Quit the sessions opened by send_email_async, then release the rest as close() does."""
+        if self._async_slots is not None:
+            while not self._async_slots.empty():
+                slot = self._async_slots.get_nowait()
+                await self._disconnect_async(slot.server)
+            self._async_slots = None
+        await asyncio.to_thread(self.close)
+    
+    async def send_bulk_async(self, email_list: Iterable[Dict[str, Any]],
+                              concurrency: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Send many emails over several concurrent SMTP sessions (requires aiosmtplib).
+        
+        Each session takes messages from a shared queue, so a slow recipient
+        server only holds up one session. Retry and recycling rules match send_bulk.
+        
+        Args:
+            email_list: Email dictionaries as accepted by send_email
+            concurrency: Number of parallel sessions (defaults to CONFIG.CONCURRENCY)
+        
+        Returns:
+            Tuple of (sent, failed) counts
+        """
+        if aiosmtplib is None:
+            raise RuntimeError("aiosmtplib is not installed")
+        
+        queue = asyncio.Queue()
+        failed = 0
+        for email_data in email_list:
+            to_email = email_data.get('to')
+            subject = email_data.get('subject')
+            body = email_data.get('body')
+            if not all([to_email, subject, body]):
+                logger.error("Missing required email fields")
+                failed += 1
+                continue
+            queue.put_nowait((to_email, self.create_email(
+                to_email, subject, body,
+                email_data.get('from_name'), email_data.get('content_type')
+            ).as_bytes()))
+        
+        sent = 0
+        
+        async def session():
+            nonlocal sent, failed
+            server = None
+            messages_on_connection = 0
+            try:
+                while not queue.empty():
+                    to_email, raw = queue.get_nowait()
+                    for attempt in range(1, self.max_retries + 1):
+                        try:
+                            if server is None or messages_on_connection >= CONFIG.EMAIL_BATCH_SIZE:
+                                await self._disconnect_async(server)
+                                server = None
+                                server = await self._connect_async()
+                                messages_on_connection = 0
+                            
+                            await server.sendmail(self.smtp_user, [to_email], raw)
+                            messages_on_connection += 1
+                            sent += 1
+                            logger.info("Email sent successfully to %s", to_email)
+                            # IMAP is blocking; the APPEND runs on the sender's background thread
+                            self._queue_sent_copy(raw)
+                            break
+                        except (aiosmtplib.SMTPException, OSError) as e:
+                            if not self._is_transient_async(e) or attempt == self.max_retries:
+                                logger.error(f"Failed to send email to {to_email}: {e}")
+                                failed += 1
+                                break
+                            logger.warning(f"SMTP error on attempt {attempt}/{self.max_retries} for {to_email}: {e}")
+                            await self._disconnect_async(server)
+                            server = None
+                            await asyncio.sleep(2 ** (attempt - 1))
+            finally:
+                await self._disconnect_async(server)
+        
+        sessions = max(1, min(concurrency or CONFIG.CONCURRENCY, queue.qsize()))
+        await asyncio.gather(*(session() for _ in range(sessions)))
+        return sent, failed
+    
+    def send_bulk_concurrent(self, email_list: Iterable[Dict[str, Any]],
+                             concurrency: Optional[int] = None) -> Tuple[int, int]:
+        """Synchronous wrapper around send_bulk_async for callers without an event loop."""
+        return asyncio.run(self.send_bulk_async(email_list, concurrency))
+    
     def test_connection(self) -> bool:
-        """Test SMTP connection and credentials."""
+        """
+        Test SMTP connection and credentials.
+        
+        The result is reused for CONNECTION_TEST_TTL seconds so polling the
+        status does not log in every time; an authentication failure is
+        remembered for AUTH_FAILURE_TTL seconds to avoid provider lockouts.
+        """
+        now = time.monotonic()
+        if self._last_test is not None and now < self._last_test[0]:
+            return self._last_test[1]
+        
+        ttl = CONNECTION_TEST_TTL
         try:
-            # Use SMTP_SSL for port 465, SMTP with starttls for port 587
-            if self.smtp_port == 465:
-                # SSL connection
-                with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=10) as server:
-                    server.login(self.smtp_user, self.smtp_password)
-            else:
-                # TLS connection (port 587 or 25)
-                with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=10) as server:
-                    server.starttls()
-                    server.login(self.smtp_user, self.smtp_password)
+            with self._connect():
+                pass
             
             logger.info("SMTP connection test successful")
-            return True
+            result = True
         except TimeoutError as e:
             logger.error(f"Connection timeout: {e}")
-            return False
+            result = False
         except smtplib.SMTPAuthenticationError as e:
             logger.error(f"Authentication failed: {e}")
-            return False
+            ttl = AUTH_FAILURE_TTL
+            result = False
         except smtplib.SMTPConnectError as e:
             logger.error(f"Connection failed: {e}")
-            return False
+            result = False
         except Exception as e:
             logger.error(f"SMTP connection test failed: {e}")
-            return False
+            result = False
+        
+        self._last_test = (now + ttl, result)
+        return result
+
+
+# Template bodies are parsed once at import; user values are HTML-escaped on substitution
+_SCREENING_TEMPLATE = Template("""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <p>Dear $candidate_name,</p>
+            
+            <p>Thank you for your interest in the <strong>$position</strong> position at $company_name. 
+            We have reviewed your CV and are impressed with your qualifications.</p>
+            
+            <p>We would like to move forward with your application and learn more about your experience. 
+            Please take a moment to answer the following questions:</p>
+            
+            $questions_block
+            
+            $additional_block
+            
+            <p>Please reply to this email with your responses at your earliest convenience.</p>
+            
+            <p>We look forward to hearing from you!</p>
+            
+            <p>Best regards,<br>
+            $hr_name<br>
+            $company_name</p>
+        </body>
+        </html>
+        """)
+
+_REJECTION_TEMPLATE = Template("""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <p>Dear $candidate_name,</p>
+            
+            <p>Thank you for taking the time to apply for the <strong>$position</strong> position at $company_name 
+            and for sharing your CV with us.</p>
+            
+            <p>After careful consideration, we regret to inform you that we will not be moving forward with 
+            your application at this time. We received many qualified applications, and the selection process 
+            was highly competitive.</p>
+            
+            $additional_block
+            
+            <p>We appreciate your interest in $company_name and encourage you to apply for future opportunities 
+            that match your skills and experience.</p>
+            
+            <p>We wish you all the best in your job search and future career endeavors.</p>
+            
+            <p>Best regards,<br>
+            $hr_name<br>
+            $company_name</p>
+        </body>
+        </html>
+        """)
 
 
 class EmailTemplates:
@@ -247,42 +915,23 @@ class EmailTemplates:
         Returns:
             Dictionary with 'subject' and 'body' keys
         """
-        questions_html = ""
+        questions_block = ""
         if questions:
-            questions_html = "<ol>"
-            for q in questions:
-                questions_html += f"<li>{q}</li>"
-            questions_html += "</ol>"
+            questions_block = "<ol>" + "".join(f"<li>{escape(q)}</li>" for q in questions) + "</ol>"
         
-        body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <p>Dear {candidate_name},</p>
-            
-            <p>Thank you for your interest in the <strong>{position}</strong> position at {company_name}. 
-            We have reviewed your CV and are impressed with your qualifications.</p>
-            
-            <p>We would like to move forward with your application and learn more about your experience. 
-            Please take a moment to answer the following questions:</p>
-            
-            {questions_html}
-            
-            {f"<p>{additional_info}</p>" if additional_info else ""}
-            
-            <p>Please reply to this email with your responses at your earliest convenience.</p>
-            
-            <p>We look forward to hearing from you!</p>
-            
-            <p>Best regards,<br>
-            {hr_name}<br>
-            {company_name}</p>
-        </body>
-        </html>
-        """
+        body = _SCREENING_TEMPLATE.substitute(
+            candidate_name=escape(candidate_name),
+            position=escape(position),
+            company_name=escape(company_name),
+            hr_name=escape(hr_name),
+            questions_block=questions_block,
+            additional_block=f"<p>{escape(additional_info)}</p>" if additional_info else ""
+        )
         
         return {
             'subject': f"Application for {position} - Next Steps",
-            'body': body
+            'body': body,
+            'content_type': 'html'
         }
     
     @staticmethod
@@ -301,35 +950,18 @@ class EmailTemplates:
         Returns:
             Dictionary with 'subject' and 'body' keys
         """
-        body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <p>Dear {candidate_name},</p>
-            
-            <p>Thank you for taking the time to apply for the <strong>{position}</strong> position at {company_name} 
-            and for sharing your CV with us.</p>
-            
-            <p>After careful consideration, we regret to inform you that we will not be moving forward with 
-            your application at this time. We received many qualified applications, and the selection process 
-            was highly competitive.</p>
-            
-            {f"<p>{additional_message}</p>" if additional_message else ""}
-            
-            <p>We appreciate your interest in {company_name} and encourage you to apply for future opportunities 
-            that match your skills and experience.</p>
-            
-            <p>We wish you all the best in your job search and future career endeavors.</p>
-            
-            <p>Best regards,<br>
-            {hr_name}<br>
-            {company_name}</p>
-        </body>
-        </html>
-        """
+        body = _REJECTION_TEMPLATE.substitute(
+            candidate_name=escape(candidate_name),
+            position=escape(position),
+            company_name=escape(company_name),
+            hr_name=escape(hr_name),
+            additional_block=f"<p>{escape(additional_message)}</p>" if additional_message else ""
+        )
         
         return {
             'subject': f"Application Update - {position} Position",
-            'body': body
+            'body': body,
+            'content_type': 'html'
         }
     
     @staticmethod
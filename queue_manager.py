@@ -1,15 +1,124 @@
 """RabbitMQ message queue implementation for email processing."""
 import pika
 import json
+import asyncio
+import atexit
 import logging
 import time
-from typing import Dict, Any, Callable
-from config import Config
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Tuple
+from config import CONFIG
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# orjson is several times faster on the per-message encode/decode; json is the fallback
+try:
+    import orjson
+    
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    
+    _loads = json.loads
+
+# Optional: asyncio consumer that keeps many sends in flight on one thread
+try:
+    import aio_pika
+except ImportError:
+    aio_pika = None
+
+# Bulk publishing stops once this many attempts are in and over a third failed
+BREAKER_MIN_ATTEMPTS = 30
+
+# Publish properties are identical for every task, so build them once
+_PERSISTENT_PROPERTIES = pika.BasicProperties(delivery_mode=2, content_type='application/json')
+_TRANSIENT_PROPERTIES = pika.BasicProperties(delivery_mode=1, content_type='application/json')
+
+
+# Components on the same thread share one connection, each on its own channel.
+# pika connections are not thread-safe, so other threads get their own.
+_local = threading.local()
+_shared_connections = set()
+_shared_lock = threading.Lock()
+
+
+def get_shared_connection() -> pika.BlockingConnection:
+    """Return this thread's RabbitMQ connection, opening a new one if it is missing or closed."""
+    connection = getattr(_local, 'connection', None)
+    if connection is None or connection.is_closed:
+        credentials = pika.PlainCredentials(
+            CONFIG.RABBITMQ_USER,
+            CONFIG.RABBITMQ_PASSWORD
+        )
+        parameters = pika.ConnectionParameters(
+            host=CONFIG.RABBITMQ_HOST,
+            port=CONFIG.RABBITMQ_PORT,
+            credentials=credentials,
+            heartbeat=600,
+            blocked_connection_timeout=300
+        )
+        connection = pika.BlockingConnection(parameters)
+        _local.connection = connection
+        with _shared_lock:
+            _shared_connections.difference_update([c for c in _shared_connections if c.is_closed])
+            _shared_connections.add(connection)
+    return connection
+
+
+@atexit.register
+def close_shared_connections():
+    """Close every connection opened by get_shared_connection."""
+    with _shared_lock:
+        connections = list(_shared_connections)
+        _shared_connections.clear()
+    for connection in connections:
+        try:
+            if not connection.is_closed:
+                connection.close()
+                logger.info("RabbitMQ connection closed")
+        except Exception as e:
+            logger.error(f"Error closing RabbitMQ connection: {e}")
+
+
+def _shard_key(to_email: str) -> str:
+    """Consistent-hash routing key for a recipient, per CONFIG.RABBITMQ_SHARD_BY."""
+    if CONFIG.RABBITMQ_SHARD_BY == 'domain':
+        return to_email.rpartition('@')[2].lower()
+    return to_email
+
+
+def declare_email_queues(channel) -> List[str]:
+    """
+    Declare the email queue topology on a channel.
+    
+    With RABBITMQ_SHARD_COUNT > 1, tasks go through a consistent-hash exchange
+    bound to one queue per shard, so throughput scales past a single queue.
+    
+    Returns:
+        Names of the queues consumers should read from
+    """
+    if CONFIG.RABBITMQ_SHARD_COUNT <= 1:
+        channel.queue_declare(queue=CONFIG.RABBITMQ_QUEUE, durable=True)
+        return [CONFIG.RABBITMQ_QUEUE]
+    
+    channel.exchange_declare(
+        exchange=CONFIG.RABBITMQ_EXCHANGE,
+        exchange_type='x-consistent-hash',
+        durable=True
+    )
+    queues = [f"{CONFIG.RABBITMQ_QUEUE}.{i}" for i in range(CONFIG.RABBITMQ_SHARD_COUNT)]
+    for queue in queues:
+        channel.queue_declare(queue=queue, durable=True)
+        # For consistent-hash exchanges the binding key is the shard weight
+        channel.queue_bind(queue=queue, exchange=CONFIG.RABBITMQ_EXCHANGE, routing_key='1')
+    return queues
+
+
 class EmailQueueProducer:
     """Producer to send email tasks to RabbitMQ."""
     
@@ -22,33 +131,18 @@ class EmailQueueProducer:
     def connect(self):
         """Establish connection to RabbitMQ."""
         try:
-            credentials = pika.PlainCredentials(
-                Config.RABBITMQ_USER,
-                Config.RABBITMQ_PASSWORD
-            )
-            parameters = pika.ConnectionParameters(
-                host=Config.RABBITMQ_HOST,
-                port=Config.RABBITMQ_PORT,
-                credentials=credentials,
-                heartbeat=600,
-                blocked_connection_timeout=300
-            )
-            
-            self.connection = pika.BlockingConnection(parameters)
+            self.connection = get_shared_connection()
             self.channel = self.connection.channel()
             
-            # Declare queue with persistence
-            self.channel.queue_declare(
-                queue=Config.RABBITMQ_QUEUE,
-                durable=True
-            )
+            # Declare queue(s) with persistence
+            declare_email_queues(self.channel)
             
             logger.info("Successfully connected to RabbitMQ")
         except Exception as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
             raise
     
-    def send_email_task(self, email_data: Dict[str, Any]) -> bool:
+    def send_email_task(self, email_data: Dict[str, Any], persistent: bool = True) -> bool:
         """
         Send an email task to the queue.
         
@@ -59,57 +153,134 @@ class EmailQueueProducer:
                     'subject': 'Email subject',
                     'body': 'Email body',
                     'template_type': 'screening' or 'rejection',
+                    'content_type': 'html' or 'plain' (optional, skips sniffing the body),
                     'metadata': {...}
                 }
+            persistent: Store the message on disk at the broker. Replayable
+                sends can pass False to skip the per-message fsync.
         
         Returns:
             True if successful, False otherwise
         """
+        return self._publish(_dumps(email_data), email_data.get('to', ''), persistent)
+    
+    def _publish(self, message, to_email: str, persistent: bool = True) -> bool:
+        """Publish one serialized email task, routed for its recipient."""
         try:
-            message = json.dumps(email_data)
+            if CONFIG.RABBITMQ_SHARD_COUNT > 1:
+                # Hash on the recipient (or its domain) so it always lands on the same shard
+                exchange, routing_key = CONFIG.RABBITMQ_EXCHANGE, _shard_key(to_email)
+            else:
+                exchange, routing_key = '', CONFIG.RABBITMQ_QUEUE
             
             self.channel.basic_publish(
-                exchange='',
-                routing_key=Config.RABBITMQ_QUEUE,
+                exchange=exchange,
+                routing_key=routing_key,
                 body=message,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make message persistent
-                    content_type='application/json'
-                )
+                properties=_PERSISTENT_PROPERTIES if persistent else _TRANSIENT_PROPERTIES
             )
             
-            logger.info(f"Email task queued for: {email_data.get('to', 'unknown')}")
+            logger.debug("Email task queued for: %s", to_email or 'unknown')
             return True
+        except pika.exceptions.AMQPConnectionError:
+            # Let callers holding a long-lived producer reconnect
+            raise
         except Exception as e:
             logger.error(f"Failed to queue email task: {e}")
             return False
     
-    def send_bulk_email_tasks(self, email_list: list) -> Dict[str, int]:
+    def _publish_all(self, messages: Iterable[Tuple[Any, str]], persistent: bool) -> Dict[str, int]:
         """
-        Send multiple email tasks to the queue.
+        Publish (message, recipient) pairs.
         
-        Returns:
-            Dictionary with 'success' and 'failed' counts
+        Publisher confirms are not enabled, so a counted success only means
+        the frame was written to the socket, not that the broker stored it.
+        On a BlockingChannel confirm_delivery() makes every basic_publish
+        wait for its own ack, one broker round-trip per message.
         """
-        stats = {'success': 0, 'failed': 0}
+        stats = {'success': 0, 'failed': 0, 'aborted': False}
         
-        for email_data in email_list:
-            if self.send_email_task(email_data):
+        for count, (message, to_email) in enumerate(messages, 1):
+            try:
+                queued = self._publish(message, to_email, persistent)
+            except pika.exceptions.AMQPConnectionError as e:
+                # Long-lived producers can outlive their connection; reconnect once
+                logger.warning(f"RabbitMQ connection lost, reconnecting: {e}")
+                self.connect()
+                queued = self._publish(message, to_email, persistent)
+            
+            if queued:
                 stats['success'] += 1
             else:
                 stats['failed'] += 1
+                # Circuit breaker: stop a batch that is mostly failing instead of grinding through it
+                if count >= BREAKER_MIN_ATTEMPTS and stats['failed'] * 3 > count:
+                    logger.warning(
+                        f"Aborting bulk queue: {stats['failed']} of {count} publishes failed"
+                    )
+                    stats['aborted'] = True
+                    break
         
         logger.info(f"Bulk queue operation: {stats['success']} succeeded, {stats['failed']} failed")
         return stats
     
+    def send_bulk_email_tasks(self, email_tasks: Iterable[Dict[str, Any]],
+                              persistent: bool = True) -> Dict[str, int]:
+        """
+        Send multiple email tasks to the queue.
+        
+        Tasks are consumed lazily, so a generator can be passed to avoid
+        holding the whole batch in memory.
+        
+        Returns:
+            Dictionary with 'success' and 'failed' counts, and 'aborted' if
+            the batch was cut short because most publishes were failing
+        """
+        return self._publish_all(
+            ((_dumps(email_data), email_data.get('to', '')) for email_data in email_tasks),
+            persistent
+        )
+    
+    @staticmethod
+    def _make_serializer(shared: Dict[str, Any]) -> Callable[[str], bytes]:
+        """
+        Build a serializer for tasks that differ only in 'to'.
+        
+        The shared fields are encoded once; each call only encodes the
+        recipient and joins it between the precomputed prefix and suffix.
+        """
+        marker = '__LIZMAIL_TO__'
+        parts = _dumps({**shared, 'to': marker}).split(_dumps(marker))
+        if len(parts) != 2:
+            # Marker also appears in the shared fields; fall back to full encoding
+            return lambda to: _dumps({**shared, 'to': to})
+        prefix, suffix = parts
+        return lambda to: prefix + _dumps(to) + suffix
+    
+    def send_bulk_email_tasks_shared(self, shared: Dict[str, Any], recipients: Iterable[str],
+                                     persistent: bool = True) -> Dict[str, int]:
+        """
+        Send the same email to many recipients.
+        
+        Args:
+            shared: Fields common to every task (subject, body, from_name, template_type, content_type)
+            recipients: Recipient addresses; each message is serialized only when it is published
+            persistent: See send_email_task
+        
+        Returns:
+            Dictionary with 'success' and 'failed' counts, and 'aborted' if
+            the batch was cut short because most publishes were failing
+        """
+        serialize = self._make_serializer(shared)
+        return self._publish_all(((serialize(to), to) for to in recipients), persistent)
+    
     def close(self):
-        """Close RabbitMQ connection."""
+        """Close this producer's channel; the shared connection is closed at exit."""
         try:
-            if self.connection and not self.connection.is_closed:
-                self.connection.close()
-                logger.info("RabbitMQ connection closed")
+            if self.channel and self.channel.is_open:
+                self.channel.close()
         except Exception as e:
-            logger.error(f"Error closing RabbitMQ connection: {e}")
+            logger.error(f"Error closing RabbitMQ channel: {e}")
 
 
 class EmailQueueConsumer:
@@ -124,35 +295,28 @@ class EmailQueueConsumer:
         """
         self.connection = None
         self.channel = None
+        self.queues = []
         self.email_sender_callback = email_sender_callback
+        # Sends run off the connection thread, one per pooled SMTP session
+        self.executor = ThreadPoolExecutor(
+            max_workers=CONFIG.SMTP_POOL_SIZE,
+            thread_name_prefix='email-send'
+        )
+        self._pace_lock = threading.Lock()
+        self._next_send = 0.0
         self.connect()
     
     def connect(self):
         """Establish connection to RabbitMQ."""
         try:
-            credentials = pika.PlainCredentials(
-                Config.RABBITMQ_USER,
-                Config.RABBITMQ_PASSWORD
-            )
-            parameters = pika.ConnectionParameters(
-                host=Config.RABBITMQ_HOST,
-                port=Config.RABBITMQ_PORT,
-                credentials=credentials,
-                heartbeat=600,
-                blocked_connection_timeout=300
-            )
-            
-            self.connection = pika.BlockingConnection(parameters)
+            self.connection = get_shared_connection()
             self.channel = self.connection.channel()
             
-            # Declare queue (ensure it exists)
-            self.channel.queue_declare(
-                queue=Config.RABBITMQ_QUEUE,
-                durable=True
-            )
+            # Declare queue(s) (ensure they exist)
+            self.queues = declare_email_queues(self.channel)
             
-            # Set QoS to process one message at a time
-            self.channel.basic_qos(prefetch_count=1)
+            # Buffer a few deliveries beyond the sender threads so a freed thread never waits on the broker
+            self.channel.basic_qos(prefetch_count=max(CONFIG.CONSUMER_PREFETCH, CONFIG.SMTP_POOL_SIZE))
             
             logger.info("Consumer connected to RabbitMQ")
         except Exception as e:
@@ -160,39 +324,61 @@ class EmailQueueConsumer:
             raise
     
     def callback(self, ch, method, properties, body):
-        """Process a message from the queue."""
+        """Hand a message from the queue to a sender thread."""
+        self.executor.submit(self.process_message, ch, method.delivery_tag, body)
+    
+    def _pace(self):
+        """
+        Wait for this thread's send slot.
+        
+        Send starts are spaced CONFIG.PROCESSING_DELAY apart across all sender
+        threads. Time already spent sending counts toward the gap, and idle
+        time is not banked, so a backlog never bursts past the configured rate.
+        """
+        with self._pace_lock:
+            now = time.monotonic()
+            start = max(now, self._next_send)
+            self._next_send = start + CONFIG.PROCESSING_DELAY
+        if start > now:
+            time.sleep(start - now)
+    
+    def _threadsafe(self, fn: Callable, **kwargs):
+        """Run a channel operation on the connection thread; pika is not thread-safe."""
+        self.connection.add_callback_threadsafe(functools.partial(fn, **kwargs))
+    
+    def process_message(self, ch, delivery_tag: int, body: bytes):
+        """Process a message from the queue (runs on a sender thread)."""
         try:
             # Parse message
-            email_data = json.loads(body)
-            logger.info(f"Processing email for: {email_data.get('to', 'unknown')}")
+            email_data = _loads(body)
+            logger.debug("Processing email for: %s", email_data.get('to', 'unknown'))
             
-            # Send email using callback
+            # Send email using callback, paced to avoid overwhelming the SMTP server
+            self._pace()
             success = self.email_sender_callback(email_data)
             
             if success:
                 # Acknowledge message
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                logger.info(f"Email sent successfully to: {email_data.get('to', 'unknown')}")
+                self._threadsafe(ch.basic_ack, delivery_tag=delivery_tag)
+                logger.debug("Email acknowledged for: %s", email_data.get('to', 'unknown'))
             else:
                 # Reject and requeue for retry
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+                self._threadsafe(ch.basic_nack, delivery_tag=delivery_tag, requeue=True)
                 logger.warning(f"Email failed, requeuing: {email_data.get('to', 'unknown')}")
             
-            # Add delay to prevent overwhelming SMTP server
-            time.sleep(Config.PROCESSING_DELAY)
-            
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             # Reject without requeue if message is malformed
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            self._threadsafe(ch.basic_nack, delivery_tag=delivery_tag, requeue=False)
     
     def start_consuming(self):
         """Start consuming messages from the queue."""
         try:
-            self.channel.basic_consume(
-                queue=Config.RABBITMQ_QUEUE,
-                on_message_callback=self.callback
-            )
+            for queue in self.queues:
+                self.channel.basic_consume(
+                    queue=queue,
+                    on_message_callback=self.callback
+                )
             
             logger.info("Started consuming messages. Press CTRL+C to exit.")
             self.channel.start_consuming()
@@ -208,8 +394,119 @@ class EmailQueueConsumer:
         try:
             if self.channel:
                 self.channel.stop_consuming()
+            # Let in-flight sends finish, then deliver the acks they queued
+            self.executor.shutdown(wait=True)
             if self.connection and not self.connection.is_closed:
-                self.connection.close()
-            logger.info("Consumer stopped and connection closed")
+                self.connection.process_data_events(time_limit=0)
+            if self.channel and self.channel.is_open:
+                self.channel.close()
+            logger.info("Consumer stopped and channel closed")
         except Exception as e:
             logger.error(f"Error stopping consumer: {e}")
+
+
+class AsyncEmailQueueConsumer:
+    """asyncio consumer for email tasks (requires aio-pika)."""
+    
+    def __init__(self, email_sender_callback: Callable[[Dict[str, Any]], Awaitable[bool]]):
+        """
+        Initialize consumer.
+        
+        Args:
+            email_sender_callback: Coroutine function to call for sending emails,
+                e.g. EmailSender.send_email_async
+        """
+        if aio_pika is None:
+            raise RuntimeError("aio-pika is not installed")
+        self.connection = None
+        self.email_sender_callback = email_sender_callback
+        self._next_send = 0.0
+        # Strong references to in-flight sends; the loop only keeps weak ones
+        self._tasks = set()
+    
+    async def _declare_queues(self, channel) -> List[Any]:
+        """Declare the same topology as declare_email_queues on an aio-pika channel."""
+        if CONFIG.RABBITMQ_SHARD_COUNT <= 1:
+            return [await channel.declare_queue(CONFIG.RABBITMQ_QUEUE, durable=True)]
+        
+        exchange = await channel.declare_exchange(
+            CONFIG.RABBITMQ_EXCHANGE,
+            type='x-consistent-hash',
+            durable=True
+        )
+        queues = []
+        for i in range(CONFIG.RABBITMQ_SHARD_COUNT):
+            queue = await channel.declare_queue(f"{CONFIG.RABBITMQ_QUEUE}.{i}", durable=True)
+            await queue.bind(exchange, routing_key='1')
+            queues.append(queue)
+        return queues
+    
+    async def _pace(self):
+        """Wait for this send's slot; same schedule as EmailQueueConsumer._pace."""
+        now = time.monotonic()
+        start = max(now, self._next_send)
+        self._next_send = start + CONFIG.PROCESSING_DELAY
+        if start > now:
+            await asyncio.sleep(start - now)
+    
+    async def process_message(self, message):
+        """Process a message from the queue."""
+        try:
+            # Parse message
+            email_data = _loads(message.body)
+            logger.debug("Processing email for: %s", email_data.get('to', 'unknown'))
+            
+            # Send email using callback, paced to avoid overwhelming the SMTP server
+            await self._pace()
+            success = await self.email_sender_callback(email_data)
+            
+            if success:
+                await message.ack()
+                logger.debug("Email acknowledged for: %s", email_data.get('to', 'unknown'))
+            else:
+                # Reject and requeue for retry
+                await message.nack(requeue=True)
+                logger.warning(f"Email failed, requeuing: {email_data.get('to', 'unknown')}")
+            
+        except Exception as e:
+            logger.error(f"Error processing message: {e}")
+            # Reject without requeue if message is malformed
+            await message.nack(requeue=False)
+    
+    async def callback(self, message):
+        """Start a message's send in its own task so deliveries are not handled one at a time."""
+        task = asyncio.create_task(self.process_message(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def run(self):
+        """
+        Consume until cancelled.
+        
+        Each delivery is handled in its own task, so up to the prefetch count
+        of sends are in flight at once; SMTP sessions are bounded by the
+        sender's own pool.
+        """
+        self.connection = await aio_pika.connect_robust(
+            host=CONFIG.RABBITMQ_HOST,
+            port=CONFIG.RABBITMQ_PORT,
+            login=CONFIG.RABBITMQ_USER,
+            password=CONFIG.RABBITMQ_PASSWORD,
+            heartbeat=600
+        )
+        async with self.connection:
+            channel = await self.connection.channel()
+            await channel.set_qos(prefetch_count=max(CONFIG.CONSUMER_PREFETCH, CONFIG.SMTP_POOL_SIZE))
+            
+            for queue in await self._declare_queues(channel):
+                await queue.consume(self.callback)
+            
+            logger.info("Started consuming messages. Press CTRL+C to exit.")
+            await asyncio.Future()
+    
+    def start_consuming(self):
+        """Start consuming messages from the queue."""
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            logger.info("Consumer stopped by user")
@@ -3,6 +3,7 @@ import subprocess
 import sys
 import os
 import time
+import threading
 from pathlib import Path
 
 
@@ -42,12 +43,12 @@ def check_rabbitmq():
     """Check if RabbitMQ is running."""
     try:
         import pika
-        from config import Config
+        from config import CONFIG
         
-        credentials = pika.PlainCredentials(Config.RABBITMQ_USER, Config.RABBITMQ_PASSWORD)
+        credentials = pika.PlainCredentials(CONFIG.RABBITMQ_USER, CONFIG.RABBITMQ_PASSWORD)
         parameters = pika.ConnectionParameters(
-            host=Config.RABBITMQ_HOST,
-            port=Config.RABBITMQ_PORT,
+            host=CONFIG.RABBITMQ_HOST,
+            port=CONFIG.RABBITMQ_PORT,
             credentials=credentials,
             connection_attempts=1,
             retry_delay=1
@@ -65,6 +66,38 @@ def check_rabbitmq():
         return False
 
 
+# Seconds to wait for an in-process worker to validate config, test SMTP and reach RabbitMQ
+WORKER_START_TIMEOUT = 60
+
+
+def start_worker_thread() -> bool:
+    """
+    Run worker.main on a daemon thread and wait for it to start consuming.
+    
+    Returns:
+        True once the worker is consuming, False if it exited during startup
+    """
+    import worker
+    
+    ready = threading.Event()
+    
+    def run_worker():
+        if worker.main(ready=ready) != 0:
+            print("❌ The email worker stopped; queued emails will not be sent until it is restarted")
+    
+    thread = threading.Thread(target=run_worker, name='email-worker', daemon=True)
+    thread.start()
+    
+    deadline = time.monotonic() + WORKER_START_TIMEOUT
+    while not ready.wait(0.2):
+        if not thread.is_alive():
+            return False
+        if time.monotonic() > deadline:
+            print("⚠️  The email worker is still starting; check the log if emails stay queued")
+            break
+    return True
+
+
 def main():
     """Run the startup script."""
     print("🚀 Starting Lizmail Setup...\n")
@@ -88,9 +121,20 @@ def main():
     print("📧 Lizmail - Automated Email System")
     print("="*60)
     
+    # Run the worker on a thread here instead of a second terminal (flag or LIZMAIL_WORKER_IN_PROCESS=1)
+    worker_in_process = (
+        '--worker-in-process' in sys.argv[1:]
+        or os.getenv('LIZMAIL_WORKER_IN_PROCESS', '').lower() in ('1', 'true')
+    )
+    
     print("\n📝 To use the system:")
-    print("1. Start the worker (in a separate terminal):")
-    print("   python worker.py")
+    if worker_in_process and rabbitmq_running and start_worker_thread():
+        print("1. The worker is running in this process")
+    else:
+        if worker_in_process and rabbitmq_running:
+            print("❌ The email worker failed to start (see the log above)")
+        print("1. Start the worker (in a separate terminal):")
+        print("   python worker.py")
     print("\n2. The Streamlit app will open in your browser")
     print("\n3. Configure SMTP settings in the web interface or .env file")
     print("\n" + "="*60 + "\n")
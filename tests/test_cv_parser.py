@@ -0,0 +1,45 @@
+"""Tests for CV email extraction."""
+import re
+
+import pytest
+
+import cv_parser
+
+# The candidate pattern the re2 engine scans with, compiled with re so the
+# confirmation step is exercised even when google-re2 is not installed
+_LOOSE_RE = re.compile(r'[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,24}')
+
+BOUNDARY_CASES = [
+    ('john@acme.comx1', []),
+    ('john@acme.com-x', []),
+    ('mail john@acme.com_old', []),
+    ('.john@acme.com', []),
+    ('Contact: john@acme.com.', ['john@acme.com']),
+    ('(john.doe+cv@mail.acme.co.uk)', ['john.doe+cv@mail.acme.co.uk']),
+    ('a@b.co, c@d.org', ['a@b.co', 'c@d.org']),
+    ('%%jane@acme.com', ['%%jane@acme.com']),
+    ('.x@x.ax-@xxx.aa.--ax', ['x.ax-@xxx.aa']),
+    ('no address here', []),
+]
+
+
+@pytest.fixture(params=['re', 'loose', 're2'])
+def engine(request, monkeypatch):
+    """Run find_emails with each matching engine."""
+    if request.param == 're':
+        monkeypatch.setattr(cv_parser, '_EMAIL_RE2', None)
+    elif request.param == 'loose':
+        monkeypatch.setattr(cv_parser, '_EMAIL_RE2', _LOOSE_RE)
+    elif cv_parser._EMAIL_RE2 is None:
+        pytest.skip("google-re2 is not installed")
+    return request.param
+
+
+@pytest.mark.parametrize('text, expected', BOUNDARY_CASES)
+def test_find_emails_boundaries(engine, text, expected):
+    assert cv_parser.find_emails(text) == expected
+
+
+@pytest.mark.parametrize('text, _', BOUNDARY_CASES)
+def test_find_emails_matches_findall(engine, text, _):
+    assert cv_parser.find_emails(text) == cv_parser._EMAIL_RE.findall(text)
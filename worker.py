@@ -1,9 +1,12 @@
 """Background worker to consume email tasks from RabbitMQ and send emails."""
 import sys
+import atexit
 import logging
+import threading
+from typing import Optional
 from email_sender import EmailSender
-from queue_manager import EmailQueueConsumer
-from config import Config
+from queue_manager import AsyncEmailQueueConsumer, EmailQueueConsumer
+from config import CONFIG
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,39 +15,62 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
-    """Start the email worker."""
+def main(email_sender: Optional[EmailSender] = None,
+         ready: Optional[threading.Event] = None) -> int:
+    """
+    Start the email worker.
+    
+    Args:
+        email_sender: Sender to reuse, e.g. when running inside another process;
+            a new one is created (and closed at exit) if omitted
+        ready: Optional event set once the worker has started consuming
+    
+    Returns:
+        Exit status: 0 when stopped normally, 1 on a startup or fatal error
+    """
     try:
         logger.info("Starting Email Worker...")
         
         # Validate configuration
-        Config.validate()
+        CONFIG.validate()
+        
+        # --async runs one event loop instead of sender threads (needs aio-pika and aiosmtplib)
+        use_async = '--async' in sys.argv[1:]
         
         # Initialize email sender
-        email_sender = EmailSender()
+        if email_sender is None:
+            email_sender = EmailSender()
+            atexit.register(email_sender.close)
         
         # Test SMTP connection
         if not email_sender.test_connection():
             logger.error("SMTP connection failed. Please check your configuration.")
-            sys.exit(1)
+            return 1
         
         logger.info("SMTP connection verified successfully")
         
         # Initialize and start consumer
-        consumer = EmailQueueConsumer(email_sender.send_email)
+        if use_async:
+            consumer = AsyncEmailQueueConsumer(email_sender.send_email_async)
+        else:
+            consumer = EmailQueueConsumer(email_sender.send_email)
         
         logger.info("Email Worker is ready and waiting for messages...")
-        logger.info(f"Queue: {Config.RABBITMQ_QUEUE}")
+        logger.info(f"Queue: {CONFIG.RABBITMQ_QUEUE}")
         logger.info("Press CTRL+C to stop")
         
+        if ready is not None:
+            ready.set()
         consumer.start_consuming()
         
     except KeyboardInterrupt:
         logger.info("Email Worker stopped by user")
     except Exception as e:
         logger.error(f"Fatal error in Email Worker: {e}")
-        sys.exit(1)
+        return 1
+    
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())